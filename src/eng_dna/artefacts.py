@@ -7,10 +7,35 @@ version linkage in one place to avoid divergent SQL across commands.
 from __future__ import annotations
 
 import json
+import os
+import sqlite3
+from functools import lru_cache
 from typing import Iterable, Optional
 
+from .db import transaction
 from .identity import generate_dna_token, normalize_path
 
+# UPDATE ... RETURNING arrived in SQLite 3.35; older builds fall back to a re-select.
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Run before an artefact's path or hash changes: the hash_cache row for its old
+# path is either dead (moved) or describes superseded content (rehashed).
+_FORGET_CACHED_HASH_SQL = "DELETE FROM hash_cache WHERE path = (SELECT path FROM artefacts WHERE id = ?)"
+
+
+# Absolute inputs resolve independently of cwd, so lookups can reuse the
+# result; relative and ~ paths always go through normalize_path.
+@lru_cache(maxsize=1024)
+def _normalize_absolute(path: str) -> str:
+    return normalize_path(path)
+
+
+def _lookup_path_key(path) -> str:
+    path = os.fspath(path)
+    if os.path.isabs(path):
+        return _normalize_absolute(path)
+    return normalize_path(path)
+
 
 def fetchone(conn, query: str, args: Iterable) -> Optional[dict]:
     """
@@ -53,7 +78,8 @@ def lookup_by_path(conn, path: str) -> Optional[dict]:
     Fetch an artefact by its stored path.
 
     Paths are normalised before comparison so updates triggered by move-detection
-    stay consistent across operations.
+    stay consistent across operations. Resolution of absolute paths is memoised
+    per process and the match uses ``idx_artefacts_path``.
 
     Parameters:
         conn: Database connection.
@@ -65,7 +91,7 @@ def lookup_by_path(conn, path: str) -> Optional[dict]:
     Side Effects:
         Database read.
     """
-    return fetchone(conn, "SELECT * FROM artefacts WHERE path = ?", [normalize_path(path)])
+    return fetchone(conn, "SELECT * FROM artefacts WHERE path = ?", [_lookup_path_key(path)])
 
 
 def lookup_by_hash(conn, file_hash: str) -> Optional[dict]:
@@ -167,6 +193,71 @@ def list_events(conn, artefact_id: int) -> list[dict]:
     return cur.fetchall()
 
 
+def list_events_with(
+    conn,
+    artefact_id: int,
+    keys: Iterable[str],
+    event_type: Optional[str] = None,
+) -> list[dict]:
+    """
+    List events for an artefact with metadata fields extracted in SQL.
+
+    Each requested key is pulled out of the stored JSON ``metadata`` with
+    ``json_extract`` and returned as an extra column named after the key, so
+    callers that only need a few fields skip parsing the document in Python.
+
+    Parameters:
+        conn: Database connection.
+        artefact_id: Artefact id.
+        keys: Top-level metadata keys to extract (missing keys yield None).
+        event_type: Optional event type filter.
+
+    Returns:
+        List of event rows (newest first), each with one extra column per key.
+
+    Side Effects:
+        Database read.
+    """
+    keys = list(keys)
+    columns = "".join(
+        ', json_extract(metadata, ?) AS "{}"'.format(key.replace('"', '""')) for key in keys
+    )
+    args: list = [f"$.{key}" for key in keys]
+    query = f"SELECT *{columns} FROM events WHERE artefact_id = ?"
+    args.append(artefact_id)
+    if event_type is not None:
+        query += " AND event_type = ?"
+        args.append(event_type)
+    cur = conn.execute(query + " ORDER BY created_at DESC", args)
+    return cur.fetchall()
+
+
+def has_event(conn, artefact_id: int, event_type: str) -> bool:
+    """
+    Check whether an artefact has at least one event of a given type.
+
+    Answers with ``EXISTS`` from ``idx_events_artefact_type``, stopping at the
+    first match instead of loading and scanning the artefact's whole history.
+
+    Parameters:
+        conn: Database connection.
+        artefact_id: Artefact id.
+        event_type: Event key (e.g. created, moved, wip_saved).
+
+    Returns:
+        True when a matching event exists.
+
+    Side Effects:
+        Database read.
+    """
+    row = fetchone(
+        conn,
+        "SELECT EXISTS(SELECT 1 FROM events WHERE artefact_id = ? AND event_type = ?) AS found",
+        [artefact_id, event_type],
+    )
+    return bool(row["found"])
+
+
 def create_artefact(
     conn,
     *,
@@ -198,15 +289,23 @@ def create_artefact(
         Writes artefacts row, tags, project links, and a 'created' event.
     """
     norm_path = normalize_path(path)
-    with conn:
-        cur = conn.execute(
-            """
-            INSERT INTO artefacts (dna_token, path, hash, type, description)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (dna_token, norm_path, file_hash, artefact_type, description),
-        )
-        artefact_id = cur.lastrowid
+    query = """
+        INSERT INTO artefacts (dna_token, path, hash, type, description)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    row = None
+    with transaction(conn):
+        if _HAS_RETURNING:
+            # The tags/projects/event writes below never touch the artefacts
+            # row, so the RETURNING row is already the final one.
+            row = conn.execute(
+                query + " RETURNING *",
+                (dna_token, norm_path, file_hash, artefact_type, description),
+            ).fetchone()
+            artefact_id = row["id"]
+        else:
+            cur = conn.execute(query, (dna_token, norm_path, file_hash, artefact_type, description))
+            artefact_id = cur.lastrowid
         record_event(
             conn,
             artefact_id,
@@ -218,7 +317,7 @@ def create_artefact(
             add_tags(conn, artefact_id, tags)
         if project_ids:
             assign_projects(conn, artefact_id, project_ids)
-    return fetch_artefact(conn, artefact_id)
+    return row if row is not None else fetch_artefact(conn, artefact_id)
 
 
 def add_tags(conn, artefact_id: int, tags: list[str]) -> None:
@@ -236,12 +335,11 @@ def add_tags(conn, artefact_id: int, tags: list[str]) -> None:
     Side Effects:
         Inserts into tags table; ignores duplicates.
     """
-    with conn:
-        for tag in tags:
-            conn.execute(
-                "INSERT OR IGNORE INTO tags (artefact_id, tag) VALUES (?, ?)",
-                (artefact_id, tag.lower()),
-            )
+    with transaction(conn):
+        conn.executemany(
+            "INSERT OR IGNORE INTO tags (artefact_id, tag) VALUES (?, ?)",
+            [(artefact_id, tag.lower()) for tag in tags],
+        )
 
 
 def assign_projects(conn, artefact_id: int, project_ids: list[str]) -> None:
@@ -259,17 +357,24 @@ def assign_projects(conn, artefact_id: int, project_ids: list[str]) -> None:
         None.
 
     Side Effects:
-        Reads project table; inserts into artefact_projects with upsert semantics.
-    """
-    with conn:
+        Reads project table (one query for all ids); inserts into
+        artefact_projects with upsert semantics.
+    """
+    with transaction(conn):
+        known = {
+            row["id"]
+            for row in conn.execute(
+                "SELECT id FROM projects WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(project_ids)),),
+            )
+        }
         for project_id in project_ids:
-            project = fetchone(conn, "SELECT * FROM projects WHERE id = ?", [project_id])
-            if not project:
+            if project_id not in known:
                 raise ValueError(f"Project '{project_id}' does not exist")
-            conn.execute(
-                "INSERT OR IGNORE INTO artefact_projects (artefact_id, project_id) VALUES (?, ?)",
-                (artefact_id, project_id),
-            )
+        conn.executemany(
+            "INSERT OR IGNORE INTO artefact_projects (artefact_id, project_id) VALUES (?, ?)",
+            [(artefact_id, project_id) for project_id in project_ids],
+        )
 
 
 def record_event(
@@ -297,7 +402,7 @@ def record_event(
         Inserts into events table.
     """
     meta_str = json.dumps(metadata) if metadata else None
-    with conn:
+    with transaction(conn):
         conn.execute(
             """
             INSERT INTO events (artefact_id, event_type, description, metadata)
@@ -307,51 +412,177 @@ def record_event(
         )
 
 
-def update_path(conn, artefact_id: int, new_path: str) -> None:
+def update_path_and_hash(
+    conn,
+    artefact_id: int,
+    *,
+    new_path: Optional[str] = None,
+    new_hash: Optional[str] = None,
+) -> dict:
+    """
+    Update an artefact's path and/or hash and return the refreshed row.
+
+    Uses ``UPDATE ... RETURNING`` so housekeeping mutates and re-reads the row
+    in a single statement instead of an UPDATE followed by a SELECT.
+
+    Parameters:
+        conn: Database connection.
+        artefact_id: Artefact id.
+        new_path: New path (normalised before storing); None keeps the current path.
+        new_hash: New SHA-256 hex digest; None keeps the current hash.
+
+    Returns:
+        Artefact row after the update.
+
+    Side Effects:
+        Updates artefacts.path/hash and timestamps; drops the hash_cache row
+        for the old path.
+    """
+    norm_path = normalize_path(new_path) if new_path is not None else None
+    query = """
+        UPDATE artefacts
+        SET path = COALESCE(?, path), hash = COALESCE(?, hash), updated_at = datetime('now')
+        WHERE id = ?
+    """
+    args = (norm_path, new_hash, artefact_id)
+    if not _HAS_RETURNING:
+        with transaction(conn):
+            conn.execute(_FORGET_CACHED_HASH_SQL, (artefact_id,))
+            conn.execute(query, args)
+        return fetch_artefact(conn, artefact_id)
+    with transaction(conn):
+        conn.execute(_FORGET_CACHED_HASH_SQL, (artefact_id,))
+        row = conn.execute(query + " RETURNING *", args).fetchone()
+    return row
+
+
+def update_metadata(
+    conn,
+    artefact_id: int,
+    *,
+    artefact_type: Optional[str] = None,
+    description: Optional[str] = None,
+) -> dict:
     """
-    Persist a path change for an artefact.
+    Update an artefact's type and/or description and return the refreshed row.
+
+    Both fields go through one ``UPDATE ... RETURNING`` so re-tagging with new
+    metadata costs a single statement instead of an UPDATE and SELECT per field.
 
     Parameters:
         conn: Database connection.
         artefact_id: Artefact id.
-        new_path: New absolute path.
+        artefact_type: New type label; None keeps the current type.
+        description: New description; None keeps the current description.
+
+    Returns:
+        Artefact row after the update.
+
+    Side Effects:
+        Updates artefacts.type/description and timestamps.
+    """
+    query = """
+        UPDATE artefacts
+        SET type = COALESCE(?, type), description = COALESCE(?, description),
+            updated_at = datetime('now')
+        WHERE id = ?
+    """
+    args = (artefact_type, description, artefact_id)
+    if not _HAS_RETURNING:
+        with transaction(conn):
+            conn.execute(query, args)
+        return fetch_artefact(conn, artefact_id)
+    with transaction(conn):
+        row = conn.execute(query + " RETURNING *", args).fetchone()
+    return row
+
+
+def get_cached_hash(conn, path: str, mtime_ns: int, size: int) -> Optional[str]:
+    """
+    Look up a previously computed content hash for an unchanged file.
+
+    Parameters:
+        conn: Database connection.
+        path: Normalised file path.
+        mtime_ns: File modification time in nanoseconds.
+        size: File size in bytes.
+
+    Returns:
+        Hex digest recorded for exactly this (path, mtime_ns, size), or None.
+
+    Side Effects:
+        Database read.
+    """
+    row = fetchone(
+        conn,
+        "SELECT hash FROM hash_cache WHERE path = ? AND mtime_ns = ? AND size = ?",
+        [path, mtime_ns, size],
+    )
+    return row["hash"] if row else None
+
+
+def store_cached_hash(conn, path: str, mtime_ns: int, size: int, file_hash: str) -> None:
+    """
+    Record the content hash of a file at a given stat signature.
+
+    Parameters:
+        conn: Database connection.
+        path: Normalised file path.
+        mtime_ns: File modification time in nanoseconds.
+        size: File size in bytes.
+        file_hash: SHA-256 hex digest of the contents.
 
     Returns:
         None.
 
     Side Effects:
-        Updates artefacts.path and timestamps.
+        Inserts or replaces the single hash_cache row for *path*; joins the
+        caller's transaction when one is open.
     """
-    with conn:
+    with transaction(conn):
         conn.execute(
-            "UPDATE artefacts SET path = ?, updated_at = datetime('now') WHERE id = ?",
-            (normalize_path(new_path), artefact_id),
+            "INSERT OR REPLACE INTO hash_cache (path, mtime_ns, size, hash) VALUES (?, ?, ?, ?)",
+            (path, mtime_ns, size, file_hash),
         )
 
 
-def update_hash(conn, artefact_id: int, new_hash: str) -> None:
+def list_cached_hash_paths(conn, root: str) -> list[str]:
+    """
+    List hash_cache paths that live under a directory.
+
+    Parameters:
+        conn: Database connection.
+        root: Normalised directory path.
+
+    Returns:
+        Cached file paths below *root*.
+
+    Side Effects:
+        Database read; the prefix match is a range scan on the primary key.
     """
-    Persist a hash change for an artefact.
+    prefix = root.rstrip(os.sep) + os.sep
+    # Every path starting with prefix sorts in [prefix, prefix-with-next-separator).
+    upper = prefix[:-1] + chr(ord(os.sep) + 1)
+    cur = conn.execute("SELECT path FROM hash_cache WHERE path >= ? AND path < ?", (prefix, upper))
+    return [row["path"] for row in cur.fetchall()]
 
-    Used when the operator forces a hash overwrite instead of creating a new
-    version.
+
+def delete_cached_hashes(conn, paths: Iterable[str]) -> None:
+    """
+    Remove hash_cache rows for files that no longer exist.
 
     Parameters:
         conn: Database connection.
-        artefact_id: Artefact id.
-        new_hash: New SHA-256 hex digest.
+        paths: Normalised file paths to forget.
 
     Returns:
         None.
 
     Side Effects:
-        Updates artefacts.hash and timestamps.
+        Deletes hash_cache rows.
     """
-    with conn:
-        conn.execute(
-            "UPDATE artefacts SET hash = ?, updated_at = datetime('now') WHERE id = ?",
-            (new_hash, artefact_id),
-        )
+    with transaction(conn):
+        conn.executemany("DELETE FROM hash_cache WHERE path = ?", ((path,) for path in paths))
 
 
 def create_edge(
@@ -378,7 +609,7 @@ def create_edge(
     Side Effects:
         Inserts into edges table.
     """
-    with conn:
+    with transaction(conn):
         conn.execute(
             """
             INSERT INTO edges (parent_id, child_id, relation_type, reason)
@@ -436,7 +667,7 @@ def delete_edge(conn, edge_id: int) -> None:
     Side Effects:
         Removes a row from the edges table.
     """
-    with conn:
+    with transaction(conn):
         conn.execute("DELETE FROM edges WHERE id = ?", (edge_id,))
 
 
@@ -456,7 +687,7 @@ def delete_project_record(conn, project_id: str) -> None:
     Side Effects:
         Removes a project row and cascades link deletions.
     """
-    with conn:
+    with transaction(conn):
         conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
 
 
@@ -487,6 +718,31 @@ def list_parents(conn, child_id: int) -> list[dict]:
     return cur.fetchall()
 
 
+def has_parent(conn, child_id: int, parent_id: Optional[int] = None) -> bool:
+    """
+    Check whether a child artefact has a lineage edge from a parent.
+
+    Parameters:
+        conn: Database connection.
+        child_id: Child artefact id.
+        parent_id: Specific parent id to look for; None matches any parent.
+
+    Returns:
+        True when a matching edge exists.
+
+    Side Effects:
+        Database read (``EXISTS`` over ``idx_edges_child``/``idx_edges_pcr``;
+        no rows are materialised).
+    """
+    if parent_id is None:
+        query = "SELECT EXISTS(SELECT 1 FROM edges WHERE child_id = ?) AS found"
+        args = [child_id]
+    else:
+        query = "SELECT EXISTS(SELECT 1 FROM edges WHERE parent_id = ? AND child_id = ?) AS found"
+        args = [parent_id, child_id]
+    return bool(fetchone(conn, query, args)["found"])
+
+
 def list_children(conn, parent_id: int) -> list[dict]:
     """
     List children of a parent artefact, including edge metadata.
@@ -530,12 +786,15 @@ def create_project(conn, project_id: str, name: str, description: Optional[str])
     Side Effects:
         Writes to projects table.
     """
-    with conn:
-        conn.execute(
-            "INSERT INTO projects (id, name, description) VALUES (?, ?, ?)",
-            (project_id, name, description),
-        )
-    return fetchone(conn, "SELECT * FROM projects WHERE id = ?", [project_id])
+    query = "INSERT INTO projects (id, name, description) VALUES (?, ?, ?)"
+    args = (project_id, name, description)
+    if not _HAS_RETURNING:
+        with transaction(conn):
+            conn.execute(query, args)
+        return fetchone(conn, "SELECT * FROM projects WHERE id = ?", [project_id])
+    with transaction(conn):
+        row = conn.execute(query + " RETURNING *", args).fetchone()
+    return row
 
 
 def get_project(conn, project_id: str) -> Optional[dict]:
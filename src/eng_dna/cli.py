@@ -7,7 +7,8 @@ trigger (tagging, lineage, export/import).
 """
 from __future__ import annotations
 
-import json
+import os
+import re
 import tempfile
 import webbrowser
 from contextlib import contextmanager
@@ -17,13 +18,15 @@ from typing import Optional, List
 import click
 import typer
 
-from . import __version__, artefacts, operations, sync
+from . import __version__, artefacts, jsonio, operations, sync
 from .db import connect, ensure_schema, init_db, resolve_db_path
 
 app = typer.Typer(help="Engineering Memory / Design Lineage CLI")
 project_app = typer.Typer(help="Project management commands")
 app.add_typer(project_app, name="project")
 
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
 
 def _wrap_mermaid_html(mermaid_code: str, target_label: str) -> str:
     return f"""<!doctype html>
@@ -243,6 +246,12 @@ def tag(
         "--mode",
         help="Versioning mode: snapshot (new version on hash change) or wip (update in place; incompatible with --force-overwrite)",
     ),
+    precomputed_hash: Optional[str] = typer.Option(
+        None,
+        "--precomputed-hash",
+        hidden=True,
+        help="Use this SHA-256 digest instead of hashing the file (requires EDNA_TEST_PRECOMPUTED_HASH=1)",
+    ),
 ) -> None:
     """
     Tag a file with EDNA metadata and optionally attach tags/projects.
@@ -258,13 +267,21 @@ def tag(
         projects: Repeated project identifiers.
         force_overwrite: Overwrite stored hash instead of creating a version.
         mode: Versioning mode ('snapshot' or 'wip').
+        precomputed_hash: Hidden test hook; digest used instead of reading the
+            file. Rejected unless ``$EDNA_TEST_PRECOMPUTED_HASH`` is ``1``.
 
     Returns:
         None.
 
     Side Effects:
-        May write sidecar, create/update DB records, and emit events.
-    """
+        May write sidecar, create/update DB records, and emit events. Reads
+        environment variable EDNA_TEST_PRECOMPUTED_HASH.
+    """
+    if precomputed_hash is not None:
+        if os.environ.get("EDNA_TEST_PRECOMPUTED_HASH") != "1":
+            raise typer.BadParameter("--precomputed-hash is only available with EDNA_TEST_PRECOMPUTED_HASH=1.")
+        if not _SHA256_HEX.fullmatch(precomputed_hash):
+            raise typer.BadParameter("--precomputed-hash must be a 64-character lowercase hex SHA-256 digest.")
     mode_opt = mode.lower() if mode else "snapshot"
     if mode_opt not in {"snapshot", "wip"}:
         raise typer.BadParameter("Invalid --mode. Choose 'snapshot' or 'wip'.")
@@ -280,6 +297,7 @@ def tag(
             project_ids=list(projects) or None,
             force_overwrite=force_overwrite,
             mode=mode_opt,
+            file_hash=precomputed_hash,
         )
         _print_brief(result)
 
@@ -545,9 +563,7 @@ def export(
         bundle = sync.export_project_lineage(conn, project_id)
     output_path = output or (Path.cwd() / f"edna_lineage_{project_id}.json")
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as fh:
-        json.dump(bundle, fh, indent=2)
-        fh.write("\n")
+    output_path.write_text(jsonio.dumps(bundle, indent=True) + "\n", encoding="utf-8")
     typer.echo(
         f"Exported lineage for project {project_id} to {output_path} "
         f"(artefacts: {len(bundle['artefacts'])}, edges: {len(bundle['edges'])}, events: {len(bundle['events'])})"
@@ -573,10 +589,10 @@ def import_lineage(
         Reads bundle from disk; may write to database unless dry-run.
     """
     try:
-        data = json.loads(bundle_path.read_text(encoding="utf-8"))
+        data = jsonio.loads(bundle_path.read_bytes())
     except FileNotFoundError as exc:  # pragma: no cover - CLI entrypoint
         raise typer.BadParameter(f"Bundle not found at {bundle_path}") from exc
-    except json.JSONDecodeError as exc:
+    except jsonio.JSONDecodeError as exc:
         raise typer.BadParameter(f"Invalid lineage JSON: {exc}") from exc
     with _db() as conn:
         result = sync.import_lineage(conn, data, dry_run=dry_run)
@@ -7,11 +7,116 @@ from __future__ import annotations
 
 import os
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterator, Optional
 
 DB_FILENAME = "eng_dna.db"
 
+# Applied to every connection. WAL + synchronous=NORMAL keeps the database
+# consistent across crashes while dropping the per-commit fsync of the
+# rollback journal; the cache/mmap/temp settings favour bulk lineage imports.
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -65536;",
+    "PRAGMA mmap_size = 268435456;",
+)
+
+# Prepared statements kept per connection (sqlite3 defaults to 128). Lineage
+# import/export and the CLI cycle through more distinct queries than that.
+STATEMENT_CACHE_SIZE = 512
+
+# Bump whenever SCHEMA_SQL gains a table or index so existing databases pick it
+# up on their next ensure_schema() call.
+SCHEMA_VERSION = 4
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS artefacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dna_token TEXT UNIQUE NOT NULL,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    type TEXT,
+    description TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    artefact_id INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    description TEXT,
+    metadata TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS edges (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    parent_id INTEGER NOT NULL,
+    child_id INTEGER NOT NULL,
+    relation_type TEXT NOT NULL,
+    reason TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (parent_id) REFERENCES artefacts(id) ON DELETE CASCADE,
+    FOREIGN KEY (child_id) REFERENCES artefacts(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    artefact_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    UNIQUE (artefact_id, tag),
+    FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    artefact_id INTEGER NOT NULL,
+    note TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS artefact_projects (
+    artefact_id INTEGER NOT NULL,
+    project_id TEXT NOT NULL,
+    added_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (artefact_id, project_id),
+    FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+-- Content hashes of files whose (mtime_ns, size) had settled when hashed;
+-- lets re-tag/show skip reading unchanged files across processes.
+CREATE TABLE IF NOT EXISTS hash_cache (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artefacts_hash ON artefacts(hash);
+-- Not UNIQUE: snapshot versions of a file can share its path.
+CREATE INDEX IF NOT EXISTS idx_artefacts_path ON artefacts(path);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events(event_type);
+CREATE INDEX IF NOT EXISTS idx_edges_child ON edges(child_id);
+CREATE INDEX IF NOT EXISTS idx_edges_parent ON edges(parent_id);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
+-- Per-artefact lookups (history, lineage import/export) and edge
+-- existence checks. Tags and artefact_projects are already covered by
+-- their UNIQUE/PRIMARY KEY (artefact_id, ...) indexes.
+CREATE INDEX IF NOT EXISTS idx_events_artefact ON events(artefact_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_events_artefact_type ON events(artefact_id, event_type);
+CREATE INDEX IF NOT EXISTS idx_notes_artefact ON notes(artefact_id, note, created_at);
+CREATE INDEX IF NOT EXISTS idx_edges_pcr ON edges(parent_id, child_id, relation_type);
+CREATE INDEX IF NOT EXISTS idx_artefact_projects_project ON artefact_projects(project_id);
+"""
+
 
 def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
     """
@@ -27,7 +132,7 @@ def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
     Side Effects:
         None.
     """
-    return {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
+    return dict(zip([col[0] for col in cursor.description], row))
 
 
 def resolve_db_path(
@@ -86,28 +191,74 @@ def resolve_db_path(
     return (start_path / DB_FILENAME).resolve()
 
 
-def connect(db_path: Path) -> sqlite3.Connection:
+def connect(db_path: Path | str) -> sqlite3.Connection:
     """
     Open a SQLite connection with EDNA defaults.
 
-    Ensures foreign key enforcement is enabled and the parent directory exists.
+    Ensures foreign key enforcement is enabled, applies the WAL/cache tuning in
+    ``CONNECTION_PRAGMAS``, and makes sure the parent directory exists.
 
     Parameters:
-        db_path: Path to eng_dna.db.
+        db_path: Path to eng_dna.db, or a ``file:`` URI string (e.g. a
+            shared-cache in-memory database) opened in URI mode.
 
     Returns:
         SQLite connection configured with dict rows.
 
     Side Effects:
-        Creates parent directories if missing; opens database file.
+        Creates parent directories if missing; opens database file and switches
+        it to WAL journaling (persistent, creates ``-wal``/``-shm`` files).
     """
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    if isinstance(db_path, str) and db_path.startswith("file:"):
+        conn = sqlite3.connect(db_path, uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+    else:
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = _dict_factory
-    conn.execute("PRAGMA foreign_keys = ON;")
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+@contextmanager
+def transaction(conn: sqlite3.Connection, *, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Run a block in a transaction, joining one that is already open.
+
+    What:
+        Begins a transaction (``BEGIN IMMEDIATE`` when *immediate*) and commits
+        on success or rolls back on error. When *conn* is already inside a
+        transaction the block simply joins it and the outermost owner commits.
+
+    Why:
+        ``with conn:`` always commits on exit, so helpers composed inside a
+        larger unit of work (e.g. ``tag_file``) would each end the caller's
+        transaction early and pay a commit apiece.
+
+    Parameters:
+        conn: Open SQLite connection.
+        immediate: Take the write lock up front instead of on first write,
+            avoiding a read-to-write lock upgrade (SQLITE_BUSY under WAL).
+
+    Returns:
+        Context manager yielding *conn*.
+
+    Side Effects:
+        Issues BEGIN/COMMIT/ROLLBACK on *conn* when it owns the transaction.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
 def init_db(db_path: Path) -> None:
     """
     Initialise a new database file with the EDNA schema.
@@ -133,8 +284,11 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
     Create the baseline schema if it does not yet exist.
 
     What:
-        Idempotently applies CREATE TABLE statements for artefacts, events,
-        edges, tags, notes, projects, and indexes.
+        Idempotently applies ``SCHEMA_SQL`` (CREATE TABLE statements for
+        artefacts, events, edges, tags, notes, projects, and indexes) as one
+        script inside a single transaction, then stamps ``PRAGMA user_version``
+        with ``SCHEMA_VERSION``. Databases already at that version return after
+        a single PRAGMA read.
 
     Why:
         Centralising schema creation avoids drift between CLI entrypoints and
@@ -147,99 +301,17 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
         None.
 
     Side Effects:
-        Executes DDL statements; safe to run repeatedly.
+        Executes DDL statements and sets ``user_version``; safe to run
+        repeatedly. Like any ``executescript`` call, commits a pending
+        transaction on *conn* first.
     """
 
-    schema_statements: Iterable[str] = [
-        """
-        CREATE TABLE IF NOT EXISTS artefacts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            dna_token TEXT UNIQUE NOT NULL,
-            path TEXT NOT NULL,
-            hash TEXT NOT NULL,
-            type TEXT,
-            description TEXT,
-            created_at TEXT NOT NULL DEFAULT (datetime('now')),
-            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
-        );
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            artefact_id INTEGER NOT NULL,
-            event_type TEXT NOT NULL,
-            description TEXT,
-            metadata TEXT,
-            created_at TEXT NOT NULL DEFAULT (datetime('now')),
-            FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE
-        );
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS edges (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            parent_id INTEGER NOT NULL,
-            child_id INTEGER NOT NULL,
-            relation_type TEXT NOT NULL,
-            reason TEXT,
-            created_at TEXT NOT NULL DEFAULT (datetime('now')),
-            FOREIGN KEY (parent_id) REFERENCES artefacts(id) ON DELETE CASCADE,
-            FOREIGN KEY (child_id) REFERENCES artefacts(id) ON DELETE CASCADE
-        );
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS tags (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            artefact_id INTEGER NOT NULL,
-            tag TEXT NOT NULL,
-            created_at TEXT NOT NULL DEFAULT (datetime('now')),
-            UNIQUE (artefact_id, tag),
-            FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE
-        );
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            artefact_id INTEGER NOT NULL,
-            note TEXT NOT NULL,
-            created_at TEXT NOT NULL DEFAULT (datetime('now')),
-            FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE
-        );
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS projects (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            description TEXT,
-            created_at TEXT NOT NULL DEFAULT (datetime('now'))
-        );
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS artefact_projects (
-            artefact_id INTEGER NOT NULL,
-            project_id TEXT NOT NULL,
-            added_at TEXT NOT NULL DEFAULT (datetime('now')),
-            PRIMARY KEY (artefact_id, project_id),
-            FOREIGN KEY (artefact_id) REFERENCES artefacts(id) ON DELETE CASCADE,
-            FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
-        );
-        """,
-        """
-        CREATE INDEX IF NOT EXISTS idx_artefacts_hash ON artefacts(hash);
-        """,
-        """
-        CREATE INDEX IF NOT EXISTS idx_events_type ON events(event_type);
-        """,
-        """
-        CREATE INDEX IF NOT EXISTS idx_edges_child ON edges(child_id);
-        """,
-        """
-        CREATE INDEX IF NOT EXISTS idx_edges_parent ON edges(parent_id);
-        """,
-        """
-        CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
-        """,
-    ]
-
-    with conn:
-        for statement in schema_statements:
-            conn.execute(statement)
+    # Plain tuple rows regardless of the connection's row_factory.
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    (version,) = cursor.execute("PRAGMA user_version").fetchone()
+    if version >= SCHEMA_VERSION:
+        return
+    conn.executescript(
+        f"BEGIN;\n{SCHEMA_SQL}\nPRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;"
+    )
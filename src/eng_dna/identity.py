@@ -9,12 +9,27 @@ from __future__ import annotations
 
 import hashlib
 import os
+import time
 import uuid
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 DNA_PREFIX = "edna_"
+# Files modified more recently than this are not trusted by stat-based fast
+# paths: filesystem timestamps are coarse (jiffies on ext4, 1-2 s elsewhere), so
+# a same-size rewrite within one tick would otherwise go unnoticed.
+MTIME_SETTLE_NS = 2_000_000_000
+# Files this small are hashed from a single read() instead of a chunked loop.
+SMALL_FILE_HASH_BYTES = 1024 * 1024
+# hashlib.file_digest arrived in Python 3.11; 3.10 keeps the chunked loop.
+_HAS_FILE_DIGEST = hasattr(hashlib, "file_digest")
+
+
+class ResolvedPath(str):
+    """Path string produced by ``normalize_path``; normalising it again is a no-op."""
+
+    __slots__ = ()
 
 
 @dataclass
@@ -22,6 +37,8 @@ class IdentityInfo:
     dna_token: Optional[str]
     file_hash: Optional[str]
     path: str
+    mtime_ns: Optional[int] = None
+    size: Optional[int] = None
 
 
 def normalize_path(path: os.PathLike | str) -> str:
@@ -29,7 +46,10 @@ def normalize_path(path: os.PathLike | str) -> str:
     Canonicalise a filesystem path for storage and comparisons.
 
     Ensures EDNA uses the same absolute, expanded path everywhere so that
-    move-detection and hash lookups are deterministic across commands.
+    move-detection and hash lookups are deterministic across commands. The
+    result is tagged as a ``ResolvedPath`` so helpers further down a call
+    chain can accept it without resolving (and stat-ing every component)
+    again.
 
     Parameters:
         path: Pathlike or string pointing to a file.
@@ -38,9 +58,12 @@ def normalize_path(path: os.PathLike | str) -> str:
         Absolute, expanded path as a string with user components resolved.
 
     Side Effects:
-        None; purely deterministic transformation.
+        Reads symlinks along the path; none when *path* is already a
+        ``ResolvedPath``.
     """
-    return str(Path(path).expanduser().resolve())
+    if isinstance(path, ResolvedPath):
+        return path
+    return ResolvedPath(Path(path).expanduser().resolve())
 
 
 def compute_file_hash(path: os.PathLike | str, chunk_size: int = 1024 * 1024) -> str:
@@ -48,26 +71,107 @@ def compute_file_hash(path: os.PathLike | str, chunk_size: int = 1024 * 1024) ->
     Compute a SHA-256 hash of the file at *path*.
 
     Central hash routine keeps versioning decisions consistent between tag,
-    rescan, and housekeeping steps.
+    rescan, and housekeeping steps. Files up to ``SMALL_FILE_HASH_BYTES`` are
+    read with a single ``os.read`` on a raw descriptor and hashed in one call,
+    avoiding the buffered file object entirely; larger files stream through
+    ``hashlib.file_digest`` (Python 3.11+), whose C read loop reuses one
+    buffer and hashes without holding the GIL, or a *chunk_size* loop on 3.10.
+    Large reads advise the kernel of sequential access where
+    ``os.posix_fadvise`` exists and release the pages afterwards.
 
     Parameters:
         path: File to hash.
-        chunk_size: Bytes per read; tuned to avoid high memory usage.
+        chunk_size: Bytes per read for the Python 3.10 fallback loop and for
+            any bytes appended to a small file after it was stat'ed.
 
     Returns:
         Hex digest string of the file contents.
 
     Side Effects:
-        Reads the file from disk.
+        Reads the file from disk; for large files, issues page-cache hints.
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        if size <= SMALL_FILE_HASH_BYTES:
+            # Raw fd reads skip the buffered-file wrapper on the common path.
+            sha = hashlib.sha256(os.read(fd, size))
+            # Read on to EOF in case the file grew after the fstat.
+            while chunk := os.read(fd, chunk_size):
+                sha.update(chunk)
+            return sha.hexdigest()
+        _fadvise(fd, "POSIX_FADV_SEQUENTIAL")
+        try:
+            with open(fd, "rb", closefd=False) as handle:
+                if _HAS_FILE_DIGEST:
+                    return hashlib.file_digest(handle, "sha256").hexdigest()
+                sha = hashlib.sha256()
+                while True:
+                    chunk = handle.read(chunk_size)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                return sha.hexdigest()
+        finally:
+            # One-shot read: let the kernel drop these pages first.
+            _fadvise(fd, "POSIX_FADV_DONTNEED")
+    finally:
+        os.close(fd)
+
+
+def _fadvise(fd: int, advice: str) -> None:
+    # posix_fadvise is Linux/BSD only, and purely a hint: ignore any refusal.
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def compute_bytes_hash(data: bytes) -> str:
+    """
+    Compute the SHA-256 hash of in-memory content.
+
+    Produces the same digest ``compute_file_hash`` would for a file holding
+    exactly *data*.
+
+    Parameters:
+        data: Content bytes.
+
+    Returns:
+        Hex digest string.
+
+    Side Effects:
+        None.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def settled_signature(path: os.PathLike | str) -> Optional[tuple[int, int]]:
+    """
+    Return a file's ``(mtime_ns, size)`` when it is old enough to trust.
+
+    Stat-based change detection is only sound once the modification time has
+    settled beyond filesystem timestamp granularity; younger files return None
+    so callers fall back to hashing.
+
+    Parameters:
+        path: File to stat.
+
+    Returns:
+        Tuple of (mtime in ns, size in bytes), or None when the file is missing
+        or was modified within ``MTIME_SETTLE_NS``.
+
+    Side Effects:
+        Stats the file.
     """
-    sha = hashlib.sha256()
-    with open(path, "rb") as handle:
-        while True:
-            chunk = handle.read(chunk_size)
-            if not chunk:
-                break
-            sha.update(chunk)
-    return sha.hexdigest()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if time.time_ns() - st.st_mtime_ns < MTIME_SETTLE_NS:
+        return None
+    return st.st_mtime_ns, st.st_size
 
 
 def generate_dna_token() -> str:
@@ -0,0 +1,94 @@
+"""JSON encode/decode helpers shared by sidecars, lineage sync, and the CLI.
+
+Parsing uses orjson when installed (``pip install "eng-dna[fast]"``) and the
+stdlib ``json`` module otherwise, so callers never branch on which backend is
+present. Documents orjson would read differently (integers beyond 64 bits,
+which it turns into floats, and the ``NaN``/``Infinity`` literals it rejects)
+are handed to the stdlib parser, so results never depend on the backend. Both
+backends raise ``JSONDecodeError`` (orjson's subclasses the stdlib one).
+
+Serialisation always goes through stdlib ``json`` in one canonical form
+(compact separators, raw UTF-8): sidecars and stored event metadata are
+persisted and compared as text, so their bytes must not depend on which
+backend happens to be installed.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+try:  # Optional parse accelerator; stdlib json remains the reference implementation.
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+_COMPACT_SEPARATORS = (",", ":")
+# 19+ digit runs may be integers outside orjson's 64-bit range (it parses those
+# as floats); such documents go straight to the stdlib parser.
+_LONG_DIGITS = re.compile(r"\d{19}")
+_LONG_DIGITS_BYTES = re.compile(rb"\d{19}")
+
+
+def dumps(payload: Any, *, indent: bool = False, sort_keys: bool = False) -> str:
+    """
+    Serialise *payload* to JSON text in the canonical form.
+
+    Parameters:
+        payload: JSON-compatible value.
+        indent: Pretty-print with two-space indentation.
+        sort_keys: Emit object keys in sorted order for canonical output.
+
+    Returns:
+        JSON string; compact unless *indent*, with non-ASCII left unescaped.
+
+    Side Effects:
+        None.
+    """
+    if indent:
+        return json.dumps(payload, indent=2, sort_keys=sort_keys, ensure_ascii=False)
+    return json.dumps(payload, separators=_COMPACT_SEPARATORS, sort_keys=sort_keys, ensure_ascii=False)
+
+
+def dumps_bytes(payload: Any) -> bytes:
+    """
+    Serialise *payload* to compact UTF-8 JSON bytes.
+
+    Parameters:
+        payload: JSON-compatible value.
+
+    Returns:
+        Encoded JSON without insignificant whitespace; identical to
+        ``dumps(payload).encode("utf-8")``.
+
+    Side Effects:
+        None.
+    """
+    return dumps(payload).encode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """
+    Parse JSON text or UTF-8 bytes.
+
+    Parameters:
+        data: Encoded JSON document.
+
+    Returns:
+        Decoded Python value.
+
+    Side Effects:
+        None; raises JSONDecodeError on malformed input.
+    """
+    if orjson is not None:
+        long_digits = _LONG_DIGITS if isinstance(data, str) else _LONG_DIGITS_BYTES
+        if not long_digits.search(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # NaN/Infinity literals and anything else orjson refuses get
+                # the stdlib's verdict, which is the reference behaviour.
+                pass
+    return json.loads(data)
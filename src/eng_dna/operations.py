@@ -7,13 +7,25 @@ stay thin and database primitives remain reusable.
 from __future__ import annotations
 
 import itertools
-from collections import deque
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, Optional
 
 from . import artefacts
-from .identity import compute_file_hash, generate_dna_token, looks_like_dna, normalize_path
+from .identity import (
+    IdentityInfo,
+    ResolvedPath,
+    compute_bytes_hash,
+    compute_file_hash,
+    generate_dna_token,
+    looks_like_dna,
+    normalize_path,
+    settled_signature,
+)
+from .db import transaction
 from .sidecar import get_sidecar_path, read_identity, write_identity
 
 
@@ -42,6 +54,13 @@ TYPE_TO_CLASS = {
 }
 MERMAID_DIRECTION_DEFAULT = "LR"
 
+# Shared pool so hashing can overlap the sidecar read without per-call thread spawn cost.
+_IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="edna-io")
+
+# In-process front for the hash_cache table: path -> ((mtime_ns, size), hash).
+HASH_MEMO_SIZE = 4096
+_hash_memo: "OrderedDict[str, tuple[tuple[int, int], str]]" = OrderedDict()
+
 
 def tag_file(
     conn,
@@ -53,6 +72,8 @@ def tag_file(
     project_ids: Optional[list[str]],
     force_overwrite: bool = False,
     mode: str = "snapshot",
+    content: Optional[bytes] = None,
+    file_hash: Optional[str] = None,
 ) -> dict:
     """
     Tag a file by assigning (or reconciling) a DNA record and metadata.
@@ -74,13 +95,18 @@ def tag_file(
         force_overwrite: If True, allows overwriting hash instead of versioning.
         mode: 'snapshot' (default) to create new versions on hash change or
             'wip' to update the existing artefact in place.
+        content: Bytes to hash instead of reading *file_path*; the artefact is
+            still recorded (and its sidecar written) at *file_path*, which
+            must exist.
+        file_hash: Precomputed SHA-256 hex digest to use as-is; mutually
+            exclusive with *content*. *file_path* must still exist.
 
     Returns:
         Artefact row representing the tracked item (new or existing/versioned).
 
     Side Effects:
-        Reads file for hashing; may write sidecar; may insert/update DB rows and
-        record events.
+        Reads file for hashing unless *content* or *file_hash* is given; may write sidecar; may insert/update
+        DB rows, record events, and record the hash in the hash cache, all in one transaction.
     """
     valid_modes = {"snapshot", "wip"}
     mode_normalised = mode.lower() if mode else "snapshot"
@@ -88,47 +114,75 @@ def tag_file(
         raise ValueError(f"Invalid mode '{mode}'. Expected one of {sorted(valid_modes)}.")
     if mode_normalised == "wip" and force_overwrite:
         raise ValueError("--force-overwrite cannot be combined with mode='wip'; WIP already updates in place.")
-
-    file_path = file_path.expanduser().resolve()
-    file_hash = compute_file_hash(file_path)
-    identity = read_identity(file_path)
-
-    existing = None
-    if identity and identity.dna_token:
-        existing = artefacts.lookup_by_dna(conn, identity.dna_token)
-    if not existing:
-        existing = artefacts.lookup_by_hash(conn, file_hash)
-
-    # Decision tree: prefer DNA from sidecar, fall back to hash match, otherwise create new.
-    if existing:
-        return _handle_existing_file(
-            conn,
-            existing,
-            file_path,
-            file_hash,
-            artefact_type,
-            description,
-            tags,
-            project_ids,
-            force_overwrite=force_overwrite,
-            identity_found=bool(identity),
-            command="tag",
-            mode=mode_normalised,
-        )
-
-    dna_token = generate_dna_token()
-    created = artefacts.create_artefact(
-        conn,
-        dna_token=dna_token,
-        path=str(file_path),
-        file_hash=file_hash,
-        artefact_type=artefact_type,
-        description=description,
-        tags=[t.lower() for t in tags] if tags else None,
-        project_ids=project_ids,
-    )
-    write_identity(file_path, created["dna_token"], file_hash, created.get("type"), created["path"])
-    return created
+    if content is not None and file_hash is not None:
+        raise ValueError("Pass either content or file_hash, not both.")
+
+    resolved = normalize_path(file_path)
+    file_path = Path(resolved)
+    cache_signature = None
+    # Caller-supplied digests say nothing about the bytes on disk, so the
+    # sidecar must not pair them with the file's stat signature.
+    hashed_from_file = content is None and file_hash is None
+    if (file_hash is not None or content is not None) and not file_path.is_file():
+        # Nothing reads the file on these paths, so check it exists explicitly.
+        raise FileNotFoundError(f"No such file: {file_path}")
+    if file_hash is not None:
+        identity = read_identity(file_path)
+    elif content is not None:
+        identity, file_hash = read_identity(file_path), compute_bytes_hash(content)
+    else:
+        identity, file_hash, cache_signature = _read_identity_and_hash(conn, file_path)
+
+    # One write transaction for the lookups and every row tag_file writes, so a
+    # tag costs a single commit and cannot interleave with another writer.
+    with transaction(conn, immediate=True):
+        existing = None
+        if identity and identity.dna_token:
+            existing = artefacts.lookup_by_dna(conn, identity.dna_token)
+        if not existing:
+            existing = artefacts.lookup_by_hash(conn, file_hash)
+
+        # Decision tree: prefer DNA from sidecar, fall back to hash match, otherwise create new.
+        if existing:
+            result = _handle_existing_file(
+                conn,
+                existing,
+                file_path,
+                file_hash,
+                artefact_type,
+                description,
+                tags,
+                project_ids,
+                force_overwrite=force_overwrite,
+                identity=identity,
+                command="tag",
+                mode=mode_normalised,
+                hashed_from_file=hashed_from_file,
+            )
+        else:
+            dna_token = generate_dna_token()
+            result = artefacts.create_artefact(
+                conn,
+                dna_token=dna_token,
+                path=resolved,
+                file_hash=file_hash,
+                artefact_type=artefact_type,
+                description=description,
+                tags=[t.lower() for t in tags] if tags else None,
+                project_ids=project_ids,
+            )
+            write_identity(
+                file_path,
+                result["dna_token"],
+                file_hash,
+                result.get("type"),
+                result["path"],
+                record_signature=hashed_from_file,
+            )
+        # Last write, so housekeeping that forgets the path's old row runs first.
+        if cache_signature is not None:
+            _remember_hash(conn, file_path, cache_signature, file_hash)
+        return result
 
 
 def show_target(
@@ -228,7 +282,8 @@ def resolve_file_reference(
     What:
         Normalises the path, reads identity markers, hashes the file, then
         searches by DNA, embedded hash, and finally fresh hash before applying
-        housekeeping actions.
+        housekeeping actions. Hashing is skipped when the sidecar's recorded
+        mtime/size still match the file and its hash matches the DB.
 
     Why:
         Keeps consistent reconciliation logic for tag, show, rescan, and graph
@@ -246,13 +301,18 @@ def resolve_file_reference(
     Side Effects:
         Reads file for hashing; may update DB path or hash; may write sidecar.
     """
-    file_path = file_path.expanduser().resolve()
+    file_path = Path(normalize_path(file_path))
     identity = read_identity(file_path)
-    file_hash = compute_file_hash(file_path)
 
     artefact = None
+    file_hash = None
     if identity and identity.dna_token:
         artefact = artefacts.lookup_by_dna(conn, identity.dna_token)
+        if artefact and artefact["hash"] == identity.file_hash and _unchanged_since_sidecar(file_path, identity):
+            # Fast path: sidecar, DB, and file stat agree, so the content cannot have changed.
+            file_hash = identity.file_hash
+    if file_hash is None:
+        file_hash = _hash_with_cache(conn, file_path)
     if not artefact and identity and identity.file_hash:
         artefact = artefacts.lookup_by_hash(conn, identity.file_hash)
     if not artefact:
@@ -266,7 +326,7 @@ def resolve_file_reference(
         conn,
         artefact,
         file_path,
-        identity_found=bool(identity),
+        identity=identity,
         file_hash=file_hash,
         force_overwrite=force_overwrite,
         allow_versioning=allow_versioning,
@@ -275,16 +335,217 @@ def resolve_file_reference(
     return updated
 
 
+def _read_identity_and_hash(
+    conn, file_path: Path
+) -> tuple[Optional[IdentityInfo], str, Optional[tuple[int, int]]]:
+    """
+    Read on-disk identity and hash file contents concurrently.
+
+    Why:
+        Both steps are independent reads of the same file; running the hash on
+        the shared pool while the sidecar is parsed lets their I/O overlap.
+        hashlib releases the GIL for large buffers, so this is real parallelism.
+        Settled, unchanged files skip the read via the hash cache; the cache
+        is only touched from the calling thread, which owns *conn*.
+
+    Parameters:
+        conn: Database connection.
+        file_path: Resolved path to an existing file.
+
+    Returns:
+        Tuple of (identity or None, SHA-256 hex digest, signature to record
+        with ``_remember_hash``). The signature is None when the digest came
+        from the cache or the file changed while it was hashed.
+
+    Side Effects:
+        Reads the artefact and its sidecar from disk; reads the hash cache but
+        leaves recording the digest to the caller's transaction.
+    """
+    signature = settled_signature(file_path)
+    cached = _cached_hash(conn, file_path, signature)
+    if cached is not None:
+        return read_identity(file_path), cached, None
+    hash_future = _IO_POOL.submit(compute_file_hash, file_path)
+    identity = read_identity(file_path)
+    file_hash = hash_future.result()
+    return identity, file_hash, _unchanged_while_hashing(file_path, signature)
+
+
+def _hash_with_cache(conn, file_path: Path) -> str:
+    """
+    Hash a file, reusing the cached digest when its stat signature is unchanged.
+
+    Used by read-only resolution, so a fresh digest is only memoised in
+    process; the hash_cache table is written by ``tag_file`` alone.
+
+    Parameters:
+        conn: Database connection.
+        file_path: Resolved path to an existing file.
+
+    Returns:
+        SHA-256 hex digest.
+
+    Side Effects:
+        Stats the file; reads it on a cache miss; may update the in-process
+        memo.
+    """
+    signature = settled_signature(file_path)
+    cached = _cached_hash(conn, file_path, signature)
+    if cached is not None:
+        return cached
+    file_hash = compute_file_hash(file_path)
+    signature = _unchanged_while_hashing(file_path, signature)
+    if signature is not None:
+        _memoise_hash(str(file_path), signature, file_hash)
+    return file_hash
+
+
+def _cached_hash(conn, file_path: Path, signature: Optional[tuple[int, int]]) -> Optional[str]:
+    """
+    Return the cached digest for *file_path* at *signature*, if any.
+
+    Only settled signatures are trusted (see ``identity.settled_signature``);
+    a None signature always misses.
+
+    Parameters:
+        conn: Database connection.
+        file_path: Resolved path to the file.
+        signature: Settled ``(mtime_ns, size)`` or None.
+
+    Returns:
+        Hex digest or None on a miss.
+
+    Side Effects:
+        Reads the in-process memo and, on a memo miss, the hash_cache table.
+    """
+    if signature is None:
+        return None
+    key = str(file_path)
+    memo = _hash_memo.get(key)
+    if memo and memo[0] == signature:
+        _hash_memo.move_to_end(key)
+        return memo[1]
+    file_hash = artefacts.get_cached_hash(conn, key, *signature)
+    if file_hash is not None:
+        _memoise_hash(key, signature, file_hash)
+    return file_hash
+
+
+def _unchanged_while_hashing(
+    file_path: Path, signature: Optional[tuple[int, int]]
+) -> Optional[tuple[int, int]]:
+    # Only a settled signature that still holds after the read describes the
+    # bytes that were hashed.
+    if signature is None or settled_signature(file_path) != signature:
+        return None
+    return signature
+
+
+def _remember_hash(conn, file_path: Path, signature: tuple[int, int], file_hash: str) -> None:
+    """
+    Record a digest computed at *signature* in the hash cache.
+
+    Called from inside ``tag_file``'s write transaction so the upsert shares
+    its commit and is rolled back with it.
+
+    Parameters:
+        conn: Database connection.
+        file_path: Resolved path to the file.
+        signature: Settled ``(mtime_ns, size)`` from ``_read_identity_and_hash``.
+        file_hash: Digest computed from the file contents.
+
+    Returns:
+        None.
+
+    Side Effects:
+        Replaces the hash_cache row for the path; writes the memo.
+    """
+    key = str(file_path)
+    artefacts.store_cached_hash(conn, key, *signature, file_hash)
+    _memoise_hash(key, signature, file_hash)
+
+
+def _memoise_hash(key: str, signature: tuple[int, int], file_hash: str) -> None:
+    """Store a digest in the bounded in-process memo, evicting the oldest entry."""
+    _hash_memo[key] = (signature, file_hash)
+    _hash_memo.move_to_end(key)
+    if len(_hash_memo) > HASH_MEMO_SIZE:
+        _hash_memo.popitem(last=False)
+
+
+def _unchanged_since_sidecar(file_path: Path, identity: IdentityInfo) -> bool:
+    """
+    Check whether a file still matches the stat signature stored in its sidecar.
+
+    Parameters:
+        file_path: Resolved path to the artefact.
+        identity: Identity read from the sidecar.
+
+    Returns:
+        True when the sidecar recorded a settled signature equal to the file's
+        current ``(mtime_ns, size)``.
+
+    Side Effects:
+        Stats the file.
+    """
+    if identity.mtime_ns is None or identity.size is None:
+        return False
+    try:
+        st = file_path.stat()
+    except FileNotFoundError:
+        return False
+    return (st.st_mtime_ns, st.st_size) == (identity.mtime_ns, identity.size)
+
+
+def _sidecar_is_current(
+    identity: Optional[IdentityInfo],
+    artefact: dict,
+    file_hash: str,
+    file_path: Path,
+    hashed_from_file: bool,
+) -> bool:
+    """
+    Check whether rewriting the sidecar would reproduce what is already there.
+
+    Only sidecars that recorded a settled signature qualify: embedded markers
+    carry none, and a hash that was not read from the file must be written
+    without one.
+
+    Parameters:
+        identity: Identity read from disk, or None.
+        artefact: Artefact row after path reconciliation.
+        file_hash: Hash the sidecar should hold.
+        file_path: Resolved path to the artefact.
+        hashed_from_file: Whether *file_hash* came from reading the file.
+
+    Returns:
+        True when token, hash, path and stat signature already match.
+
+    Side Effects:
+        Stats the file.
+    """
+    if not identity or not hashed_from_file or identity.mtime_ns is None:
+        return False
+    if (identity.dna_token, identity.file_hash, identity.path) != (
+        artefact["dna_token"],
+        file_hash,
+        artefact["path"],
+    ):
+        return False
+    return settled_signature(file_path) == (identity.mtime_ns, identity.size)
+
+
 def _post_resolve_housekeeping(
     conn,
     artefact: dict,
     file_path: Path,
     *,
-    identity_found: bool,
+    identity: Optional[IdentityInfo],
     file_hash: str,
     force_overwrite: bool,
     allow_versioning: bool,
     mode: str,
+    hashed_from_file: bool = True,
 ) -> dict:
     """
     Apply reconciliation after resolving a file to an artefact.
@@ -292,7 +553,9 @@ def _post_resolve_housekeeping(
     What:
         - Normalises and updates stored paths when files move.
         - Detects hash mismatches to decide between versioning or overwrite.
-        - Restores missing sidecars when identity is absent on disk.
+        - Restores missing sidecars when identity is absent on disk; leaves a
+          sidecar that already matches untouched, so unchanged files cost a
+          stat and no writes.
 
     Why:
         Keeps resolution side-effects predictable and auditable through events.
@@ -301,11 +564,13 @@ def _post_resolve_housekeeping(
         conn: Database connection.
         artefact: Resolved artefact row.
         file_path: Current file path.
-        identity_found: Whether a sidecar/embedded identity was present.
+        identity: Sidecar/embedded identity read from disk, or None.
         file_hash: Freshly computed hash.
         force_overwrite: Allow hash overwrite on mismatch.
         allow_versioning: Permit automatic version creation on mismatch.
         mode: Version handling ('snapshot' or 'wip') when versioning is allowed.
+        hashed_from_file: False when *file_hash* was supplied by the caller
+            rather than read from the file; see ``write_identity``.
 
     Returns:
         Updated artefact row (possibly new version).
@@ -330,10 +595,18 @@ def _post_resolve_housekeeping(
             file_hash,
             force_overwrite=force_overwrite,
             mode=mode,
+            hashed_from_file=hashed_from_file,
         )
-    else:
-        write_identity(file_path, artefact["dna_token"], file_hash, artefact.get("type"), artefact["path"])
-        if not identity_found:
+    elif not _sidecar_is_current(identity, artefact, file_hash, file_path, hashed_from_file):
+        write_identity(
+            file_path,
+            artefact["dna_token"],
+            file_hash,
+            artefact.get("type"),
+            artefact["path"],
+            record_signature=hashed_from_file,
+        )
+        if not identity:
             # If the sidecar/embedded marker was missing, rewrite it and record restoration.
             artefacts.record_event(
                 conn,
@@ -355,9 +628,10 @@ def _handle_existing_file(
     project_ids: Optional[list[str]],
     *,
     force_overwrite: bool,
-    identity_found: bool,
+    identity: Optional[IdentityInfo],
     command: str,
     mode: str,
+    hashed_from_file: bool = True,
 ) -> dict:
     """
     Update metadata for a file already tracked by EDNA.
@@ -376,9 +650,10 @@ def _handle_existing_file(
         tags: Optional tags to add.
         project_ids: Optional projects to link.
         force_overwrite: Allow hash overwrite when versioning.
-        identity_found: True if a sidecar/embedded marker was present.
+        identity: Sidecar/embedded identity read from disk, or None.
         command: Name of the invoking command for event logging.
         mode: 'snapshot' to create versions on hash change or 'wip' to update in place.
+        hashed_from_file: False when *file_hash* did not come from reading the file.
 
     Returns:
         Updated artefact row (or new version).
@@ -390,26 +665,18 @@ def _handle_existing_file(
         conn,
         artefact,
         file_path,
-        identity_found=identity_found,
+        identity=identity,
         file_hash=file_hash,
         force_overwrite=force_overwrite,
         allow_versioning=True,
         mode=mode,
+        hashed_from_file=hashed_from_file,
     )
-    if artefact_type and artefact.get("type") != artefact_type:
-        with conn:
-            conn.execute(
-                "UPDATE artefacts SET type = ?, updated_at = datetime('now') WHERE id = ?",
-                (artefact_type, artefact["id"]),
-            )
-        artefact = artefacts.fetch_artefact(conn, artefact["id"])
-    if description:
-        with conn:
-            conn.execute(
-                "UPDATE artefacts SET description = ?, updated_at = datetime('now') WHERE id = ?",
-                (description, artefact["id"]),
-            )
-        artefact = artefacts.fetch_artefact(conn, artefact["id"])
+    new_type = artefact_type if artefact_type and artefact.get("type") != artefact_type else None
+    if new_type or description:
+        artefact = artefacts.update_metadata(
+            conn, artefact["id"], artefact_type=new_type, description=description or None
+        )
     if tags:
         artefacts.add_tags(conn, artefact["id"], [t.lower() for t in tags])
     if project_ids:
@@ -434,7 +701,7 @@ def _ensure_path(conn, artefact: dict, file_path: Path) -> dict:
     Parameters:
         conn: Database connection.
         artefact: Artefact row to update if needed.
-        file_path: Current on-disk location.
+        file_path: Current on-disk location, already resolved by the caller.
 
     Returns:
         Artefact row (refreshed if a path change occurred).
@@ -443,17 +710,18 @@ def _ensure_path(conn, artefact: dict, file_path: Path) -> dict:
         Updates artefacts.path, records a 'moved' event, and rewrites the
         sidecar later in the workflow.
     """
-    norm = normalize_path(file_path)
+    # Every entry point resolves file_path up front; don't resolve it again.
+    norm = ResolvedPath(file_path)
     if artefact["path"] != norm:
         # Path normalisation ensures moves/symlinks are captured consistently before logging events.
-        artefacts.update_path(conn, artefact["id"], norm)
+        previous_path = artefact["path"]
+        artefact = artefacts.update_path_and_hash(conn, artefact["id"], new_path=norm)
         artefacts.record_event(
             conn,
             artefact["id"],
             event_type="moved",
-            metadata={"from": artefact["path"], "to": norm},
+            metadata={"from": previous_path, "to": norm},
         )
-        artefact = artefacts.fetch_artefact(conn, artefact["id"])
     return artefact
 
 
@@ -465,6 +733,7 @@ def _handle_hash_change(
     *,
     force_overwrite: bool,
     mode: str,
+    hashed_from_file: bool = True,
 ) -> dict:
     """
     Respond to a hash mismatch between disk and database.
@@ -477,10 +746,11 @@ def _handle_hash_change(
     Parameters:
         conn: Database connection.
         artefact: Existing artefact row.
-        file_path: Current path for the changed file.
+        file_path: Current (resolved) path for the changed file.
         new_hash: Fresh SHA-256 digest.
         force_overwrite: Whether to bypass versioning.
         mode: Versioning behaviour selector ('snapshot' or 'wip').
+        hashed_from_file: False when *new_hash* did not come from reading the file.
 
     Returns:
         Artefact row representing the updated or new version.
@@ -495,38 +765,38 @@ def _handle_hash_change(
     if mode == "wip":
         if force_overwrite:
             raise ValueError("WIP mode cannot be combined with force_overwrite.")
-        artefacts.update_hash(conn, artefact["id"], new_hash)
+        updated = artefacts.update_path_and_hash(conn, artefact["id"], new_hash=new_hash)
         artefacts.record_event(
             conn,
             artefact["id"],
             event_type="wip_saved",
             metadata={"hash": new_hash},
         )
-        updated = artefacts.fetch_artefact(conn, artefact["id"])
         write_identity(
             file_path,
             updated["dna_token"],
             new_hash,
             updated.get("type"),
             updated["path"],
+            record_signature=hashed_from_file,
         )
         return updated
 
     if force_overwrite:
-        artefacts.update_hash(conn, artefact["id"], new_hash)
+        updated = artefacts.update_path_and_hash(conn, artefact["id"], new_hash=new_hash)
         artefacts.record_event(
             conn,
             artefact["id"],
             event_type="hash_overwritten",
             metadata={"hash": new_hash},
         )
-        updated = artefacts.fetch_artefact(conn, artefact["id"])
         write_identity(
             file_path,
             updated["dna_token"],
             new_hash,
             updated.get("type"),
             updated["path"],
+            record_signature=hashed_from_file,
         )
         return updated
 
@@ -534,7 +804,7 @@ def _handle_hash_change(
         conn,
         artefact,
         new_hash=new_hash,
-        new_path=str(file_path),
+        new_path=ResolvedPath(file_path),
         description=artefact.get("description"),
     )
     # Versioning is triggered on hash change unless explicitly overridden.
@@ -544,6 +814,7 @@ def _handle_hash_change(
         new_hash,
         new_version.get("type"),
         new_version["path"],
+        record_signature=hashed_from_file,
     )
     return new_version
 
@@ -756,32 +1027,51 @@ def search_artefacts(
     Side Effects:
         Database read with conditional joins depending on filters.
     """
-    clauses = ["1=1"]
     params: list[str] = []
-    join_tags = False
-    join_projects = False
-
     if tags:
-        join_tags = True
-        placeholders = ",".join(["?"] * len(tags))
-        clauses.append(f"t.tag IN ({placeholders})")
         params.extend([t.lower() for t in tags])
     if artefact_type:
-        clauses.append("a.type = ?")
         params.append(artefact_type)
     if project_id:
-        join_projects = True
-        clauses.append("ap.project_id = ?")
         params.append(project_id)
 
+    query = _build_search_sql(len(tags) if tags else 0, bool(artefact_type), bool(project_id))
+    cur = conn.execute(query, tuple(params))
+    return cur.fetchall()
+
+
+@lru_cache(maxsize=64)
+def _build_search_sql(n_tags: int, has_type: bool, has_project: bool) -> str:
+    """
+    Build the search SQL for a given filter shape.
+
+    The SQL text depends only on which filters are present (and how many tags),
+    so it is generated once per shape; identical text also lets sqlite3's
+    statement cache reuse the prepared statement across calls.
+
+    Parameters:
+        n_tags: Number of tag placeholders (0 disables the tag join).
+        has_type: Whether to filter on artefact type.
+        has_project: Whether to filter on project membership.
+
+    Returns:
+        Parameterised SELECT statement.
+
+    Side Effects:
+        None.
+    """
+    clauses = ["1=1"]
     query = "SELECT DISTINCT a.* FROM artefacts a"
-    if join_tags:
+    if n_tags:
         query += " JOIN tags t ON t.artefact_id = a.id"
-    if join_projects:
+        clauses.append(f"t.tag IN ({','.join(['?'] * n_tags)})")
+    if has_project:
         query += " JOIN artefact_projects ap ON ap.artefact_id = a.id"
-    query += " WHERE " + " AND ".join(clauses) + " ORDER BY a.created_at DESC"
-    cur = conn.execute(query, tuple(params))
-    return cur.fetchall()
+    if has_type:
+        clauses.append("a.type = ?")
+    if has_project:
+        clauses.append("ap.project_id = ?")
+    return query + " WHERE " + " AND ".join(clauses) + " ORDER BY a.created_at DESC"
 
 
 def rescan_tree(conn, root: Path) -> list[str]:
@@ -805,7 +1095,8 @@ def rescan_tree(conn, root: Path) -> list[str]:
 
     Side Effects:
         Reads and writes sidecars; may update DB paths/hashes/events for many
-        artefacts.
+        artefacts; drops hash_cache rows for files under *root* that no longer
+        exist.
     """
     root = root.expanduser().resolve()
     updated: list[str] = []
@@ -818,6 +1109,10 @@ def rescan_tree(conn, root: Path) -> list[str]:
             # Orphaned or untracked files are skipped so rescans remain resilient.
             continue
         updated.append(artefact["dna_token"])
+    # Forget cached hashes of files that were deleted from under root.
+    gone = [path for path in artefacts.list_cached_hash_paths(conn, str(root)) if not Path(path).is_file()]
+    if gone:
+        artefacts.delete_cached_hashes(conn, gone)
     return updated
 
 
@@ -838,7 +1133,7 @@ def build_lineage_graph(
         Tuple of node mapping and edge list suitable for rendering.
 
     Side Effects:
-        Reads lineage edges/artefacts; tracks visited ids to avoid cycles.
+        Reads lineage edges/artefacts; queues each artefact once to avoid cycles.
     """
     valid_scopes = {"ancestors", "descendants", "full"}
     if scope not in valid_scopes:
@@ -846,57 +1141,51 @@ def build_lineage_graph(
 
     nodes: dict[int, LineageNode] = {}
     edges: list[LineageEdge] = []
-    visited: set[int] = set()
-    queue: deque[dict] = deque([root_artefact])
-
-    # Local helper to de-duplicate nodes as the traversal walks parents/children.
-    def _add_node(artefact: dict) -> None:
-        if artefact["id"] not in nodes:
-            nodes[artefact["id"]] = LineageNode(
-                id=artefact["id"],
-                dna_token=artefact["dna_token"],
-                path=artefact["path"],
-                type=artefact.get("type"),
+    edge_keys: set[tuple] = set()
+    queue: deque[dict] = deque()
+
+    # Local helper: register a node and queue it exactly once, at discovery time.
+    def _discover(artefact: dict) -> None:
+        if artefact["id"] in nodes:
+            return
+        nodes[artefact["id"]] = LineageNode(
+            id=artefact["id"],
+            dna_token=artefact["dna_token"],
+            path=artefact["path"],
+            type=artefact.get("type"),
+        )
+        queue.append(artefact)
+
+    # In 'full' scope an edge is seen from both endpoints; keep the first sighting only.
+    def _add_edge(parent_id: int, child_id: int, related: dict) -> None:
+        key = (parent_id, child_id, related.get("relation_type"), related.get("reason"))
+        if key in edge_keys:
+            return
+        edge_keys.add(key)
+        edges.append(
+            LineageEdge(
+                parent_id=parent_id,
+                child_id=child_id,
+                relation_type=related.get("relation_type"),
+                reason=related.get("reason"),
             )
+        )
 
+    _discover(root_artefact)
     while queue:
         current = queue.popleft()
-        _add_node(current)
-        if current["id"] in visited:
-            continue
-        visited.add(current["id"])
 
         if scope in {"ancestors", "full"}:
-            parents = artefacts.list_parents(conn, current["id"])
-            for parent in parents:
-                _add_node(parent)
-                edges.append(
-                    LineageEdge(
-                        parent_id=parent["id"],
-                        child_id=current["id"],
-                        relation_type=parent.get("relation_type"),
-                        reason=parent.get("reason"),
-                    )
-                )
-                # Queue parents to walk lineage upward without recursion overflow.
-                if parent["id"] not in visited:
-                    queue.append(parent)
+            # Walk lineage upward without recursion overflow.
+            for parent in artefacts.list_parents(conn, current["id"]):
+                _add_edge(parent["id"], current["id"], parent)
+                _discover(parent)
 
         if scope in {"descendants", "full"}:
-            children = artefacts.list_children(conn, current["id"])
-            for child in children:
-                _add_node(child)
-                edges.append(
-                    LineageEdge(
-                        parent_id=current["id"],
-                        child_id=child["id"],
-                        relation_type=child.get("relation_type"),
-                        reason=child.get("reason"),
-                    )
-                )
-                # Queue children to follow derivations down the graph.
-                if child["id"] not in visited:
-                    queue.append(child)
+            # Follow derivations down the graph.
+            for child in artefacts.list_children(conn, current["id"]):
+                _add_edge(current["id"], child["id"], child)
+                _discover(child)
 
     return nodes, edges
 
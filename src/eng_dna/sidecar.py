@@ -7,17 +7,29 @@ without affecting version detection.
 """
 from __future__ import annotations
 
-import json
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
 
-from .identity import IdentityInfo, normalize_path
+from .identity import IdentityInfo, normalize_path, settled_signature
+from .jsonio import JSONDecodeError, dumps as _dumps, dumps_bytes, loads as _loads
 
 EMBED_SENTINEL = ":edna:"
 # Embedding metadata changes the tracked file contents and interferes with
 # hash-based versioning. Disable embedding until we support canonical hashing.
 EMBED_ENABLED = False
+# Embedded markers live on the last line, so reads only look at this much tail.
+EMBED_TAIL_BYTES = 8192
+
+# Parsed sidecars keyed by path and validated against the sidecar's settled
+# (mtime_ns, size) so repeated lookups during a scan skip the read and parse.
+SIDECAR_CACHE_SIZE = 4096
+_sidecar_cache: "OrderedDict[Path, tuple[tuple[int, int], Optional[IdentityInfo]]]" = OrderedDict()
 
 
 @dataclass
@@ -27,14 +39,45 @@ class Handler:
     supports_embed: bool = True
 
 
-COMMENT_HANDLERS: dict[str, Handler] = {
+COMMENT_HANDLERS: Mapping[str, Handler] = MappingProxyType({
     ".py": Handler(prefix="# "),
     ".txt": Handler(prefix="# "),
     ".md": Handler(prefix="<!-- ", suffix=" -->"),
     ".yaml": Handler(prefix="# "),
     ".yml": Handler(prefix="# "),
     ".csv": Handler(prefix="# "),
-}
+})
+
+
+@lru_cache(maxsize=256)
+def _handler_for_suffix(suffix: str) -> Optional[Handler]:
+    """
+    Resolve the comment handler for a file suffix in any letter case.
+
+    Parameters:
+        suffix: Raw ``Path.suffix`` value, e.g. ``".PY"``.
+
+    Returns:
+        Matching Handler or None for formats without comment syntax.
+
+    Side Effects:
+        None; results are memoised per distinct suffix because
+        ``COMMENT_HANDLERS`` is read-only.
+    """
+    return COMMENT_HANDLERS.get(suffix.lower())
+
+
+def clear_sidecar_cache() -> None:
+    """
+    Drop every cached sidecar parse.
+
+    Returns:
+        None.
+
+    Side Effects:
+        Empties the process-wide sidecar cache.
+    """
+    _sidecar_cache.clear()
 
 
 def get_sidecar_path(file_path: Path) -> Path:
@@ -70,7 +113,7 @@ def read_identity(file_path: Path) -> Optional[IdentityInfo]:
     Side Effects:
         Reads the artefact and/or sidecar from disk.
     """
-    handler = COMMENT_HANDLERS.get(file_path.suffix.lower())
+    handler = _handler_for_suffix(file_path.suffix)
     if handler and handler.supports_embed:
         embedded = _read_embedded_identity(file_path, handler)
         if embedded:
@@ -84,6 +127,8 @@ def write_identity(
     file_hash: str,
     artefact_type: Optional[str],
     stored_path: str,
+    *,
+    record_signature: bool = True,
 ) -> None:
     """
     Persist identity information for a tracked artefact.
@@ -98,13 +143,20 @@ def write_identity(
         file_hash: Hash of the current content.
         artefact_type: Optional type label.
         stored_path: Normalised path stored in the DB for reconciliation.
+        record_signature: Whether *file_hash* was computed from the file's
+            bytes. Only then is the file's stat signature stored beside it;
+            a hash supplied by the caller must never be trusted as the
+            file's content by the resolver's hash-free fast path.
 
     Returns:
         None.
 
     Side Effects:
-        Writes/overwrites ``<file>.edna``; may append embedded marker to the file
-        when embedding is enabled.
+        Atomically replaces ``<file>.edna`` with compact JSON; may append
+        embedded marker to the file when embedding is enabled and the current
+        marker is stale. Records the file's mtime/size in the sidecar when they
+        have settled and *record_signature* is set, enabling hash-free change
+        detection.
     """
     payload = {
         "dna": dna_token,
@@ -113,23 +165,71 @@ def write_identity(
         "path": stored_path,
     }
 
-    handler = COMMENT_HANDLERS.get(file_path.suffix.lower())
-    embedded = False
+    handler = _handler_for_suffix(file_path.suffix)
     if EMBED_ENABLED and handler and handler.supports_embed:
-        embedded = _write_embedded_identity(file_path, handler, payload)
+        # Rewriting a current marker would bump the file's mtime, which keeps
+        # it from ever settling for the resolver's hash-free fast path.
+        current = _read_embedded_identity(file_path, handler)
+        if not current or (current.dna_token, current.file_hash, current.path) != (
+            dna_token,
+            file_hash,
+            stored_path,
+        ):
+            _write_embedded_identity(file_path, handler, payload)
+
+    sidecar_payload = dict(payload)
+    # Stat after any embedding so the recorded signature matches the final file.
+    signature = settled_signature(file_path) if record_signature else None
+    if signature:
+        sidecar_payload["mtime_ns"], sidecar_payload["size"] = signature
 
     sidecar_path = get_sidecar_path(file_path)
-    sidecar_path.write_text(json.dumps(payload, indent=2))
+    _sidecar_cache.pop(sidecar_path, None)
+    _write_sidecar_atomic(sidecar_path, dumps_bytes(sidecar_payload))
 
-    if embedded and sidecar_path.stat().st_size == 0:
-        # Paranoid guard – we always expect content
-        sidecar_path.write_text(json.dumps(payload))
+
+def _write_sidecar_atomic(sidecar_path: Path, data: bytes) -> None:
+    """
+    Replace a sidecar in one step so readers never see a partial file.
+
+    The payload is written to a hidden temporary file in the same directory,
+    named per process and thread so concurrent writers never share it, and
+    renamed over the sidecar. The temporary name keeps the ``.edna`` suffix
+    so directory scans skip it even if a crash leaves it behind. Unlike
+    ``tempfile.mkstemp`` (mode 0600), ``write_bytes`` honours the umask, so
+    sidecars keep their usual permissions. No fsync is issued: the database
+    is the source of truth and a lost sidecar is restored on the next tag.
+
+    Parameters:
+        sidecar_path: Final ``<name>.edna`` location.
+        data: Serialised sidecar contents.
+
+    Returns:
+        None.
+
+    Side Effects:
+        Creates and renames a temporary file next to the sidecar; removes it
+        again if the write fails.
+    """
+    tmp_path = sidecar_path.with_name(
+        f".{sidecar_path.name}.{os.getpid()}.{threading.get_ident()}.edna"
+    )
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, sidecar_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
 def _write_embedded_identity(file_path: Path, handler: Handler, payload: dict) -> bool:
     """
     Append an embedded identity marker to a supported text file.
 
+    When the previous marker is the file's final line it is replaced in place
+    by truncating the tail; otherwise the file is rewritten with every stale
+    marker stripped.
+
     Parameters:
         file_path: Target file.
         handler: Comment syntax to wrap the marker.
@@ -139,13 +239,31 @@ def _write_embedded_identity(file_path: Path, handler: Handler, payload: dict) -
         True when the marker is written.
 
     Side Effects:
-        Rewrites the file with a trailing EDNA comment; strips existing markers
-        first to avoid duplication.
+        Rewrites the file (or just its tail) with a trailing EDNA comment;
+        strips existing markers first to avoid duplication.
     """
-    text = file_path.read_text(encoding="utf-8")
-    lines = text.splitlines()
     marker = _format_marker(payload, handler)
-    lines = [line for line in lines if EMBED_SENTINEL not in line]
+    sentinel = EMBED_SENTINEL.encode("utf-8")
+    with file_path.open("r+b") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        offset = max(0, size - EMBED_TAIL_BYTES)
+        fh.seek(offset)
+        tail = fh.read()
+        marker_at = tail.rfind(sentinel)
+        if marker_at != -1:
+            line_start = tail.rfind(b"\n", 0, marker_at) + 1
+            line_end = tail.find(b"\n", marker_at)
+            trailing = b"" if line_end == -1 else tail[line_end + 1 :]
+            # Only safe when the whole marker line is inside the window and
+            # nothing but whitespace follows it.
+            if (line_start or not offset) and not trailing.strip():
+                fh.seek(offset + line_start)
+                fh.truncate()
+                fh.write(marker.encode("utf-8") + b"\n")
+                return True
+
+    text = file_path.read_text(encoding="utf-8")
+    lines = [line for line in text.splitlines() if EMBED_SENTINEL not in line]
     lines.append(marker)
     file_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
     return True
@@ -165,15 +283,16 @@ def _format_marker(payload: dict, handler: Handler) -> str:
     Side Effects:
         None.
     """
-    return f"{handler.prefix}{EMBED_SENTINEL} {json.dumps(payload)}{handler.suffix}"
+    return f"{handler.prefix}{EMBED_SENTINEL} {_dumps(payload)}{handler.suffix}"
 
 
 def _read_embedded_identity(file_path: Path, handler: Handler) -> Optional[IdentityInfo]:
     """
     Parse an embedded identity marker if present.
 
-    Scans from the end of the file so the most recent marker wins and avoids
-    deep parsing of large artefacts.
+    Only the last ``EMBED_TAIL_BYTES`` of the file are read: markers are always
+    appended as the final line, so the most recent marker wins without loading
+    large artefacts into memory.
 
     Parameters:
         file_path: Artefact path.
@@ -186,18 +305,31 @@ def _read_embedded_identity(file_path: Path, handler: Handler) -> Optional[Ident
         Reads the file from disk.
     """
     try:
-        text = file_path.read_text(encoding="utf-8")
+        with file_path.open("rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            offset = max(0, size - EMBED_TAIL_BYTES)
+            fh.seek(offset)
+            tail = fh.read()
     except FileNotFoundError:
         return None
-    for line in reversed(text.splitlines()):
-        if EMBED_SENTINEL in line:
-            json_blob = line.split(EMBED_SENTINEL, 1)[1].strip()
-            if json_blob.endswith("-->"):
+    sentinel = EMBED_SENTINEL.encode("utf-8")
+    if sentinel not in tail:
+        return None
+    # Work on raw bytes: the JSON parsers accept UTF-8 directly, so the tail is
+    # never decoded to str.
+    lines = tail.splitlines()
+    if offset and lines:
+        # The window almost always starts mid-line; that fragment is never a marker.
+        lines = lines[1:]
+    for line in reversed(lines):
+        if sentinel in line:
+            json_blob = line.split(sentinel, 1)[1].strip()
+            if json_blob.endswith(b"-->"):
                 json_blob = json_blob[: -3].strip()
-            if json_blob.startswith("{"):
+            if json_blob.startswith(b"{"):
                 try:
-                    data = json.loads(json_blob)
-                except json.JSONDecodeError:
+                    data = _loads(json_blob)
+                except (JSONDecodeError, UnicodeDecodeError):
                     continue
                 return IdentityInfo(
                     dna_token=data.get("dna"),
@@ -219,16 +351,31 @@ def _read_sidecar_identity(file_path: Path) -> Optional[IdentityInfo]:
 
     Side Effects:
         Reads the sidecar file; tolerates JSON parsing failures to avoid raising.
+        Caches the parse for sidecars whose mtime has settled.
     """
     sidecar_path = get_sidecar_path(file_path)
+    signature = settled_signature(sidecar_path)
+    if signature:
+        cached = _sidecar_cache.get(sidecar_path)
+        if cached and cached[0] == signature:
+            _sidecar_cache.move_to_end(sidecar_path)
+            return cached[1]
     if not sidecar_path.exists():
         return None
     try:
-        data = json.loads(sidecar_path.read_text())
-    except json.JSONDecodeError:
-        return None
-    return IdentityInfo(
-        dna_token=data.get("dna"),
-        file_hash=data.get("hash"),
-        path=data.get("path", normalize_path(file_path)),
-    )
+        data = _loads(sidecar_path.read_bytes())
+    except JSONDecodeError:
+        info = None
+    else:
+        info = IdentityInfo(
+            dna_token=data.get("dna"),
+            file_hash=data.get("hash"),
+            path=data.get("path", normalize_path(file_path)),
+            mtime_ns=data.get("mtime_ns"),
+            size=data.get("size"),
+        )
+    if signature:
+        _sidecar_cache[sidecar_path] = (signature, info)
+        if len(_sidecar_cache) > SIDECAR_CACHE_SIZE:
+            _sidecar_cache.popitem(last=False)
+    return info
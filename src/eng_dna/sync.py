@@ -1,18 +1,32 @@
 """Lineage sync helpers for export/import."""
 from __future__ import annotations
 
-import json
-from collections import deque
 from contextlib import nullcontext
 from datetime import datetime, timezone
-from typing import Any
+from functools import lru_cache
+from typing import Any, Iterator
+
+from . import jsonio
+from .db import transaction
 
 LINEAGE_FORMAT = "eng-dna-lineage"
 LINEAGE_VERSION = 1
+# Rows pulled per fetchmany() call when streaming export queries.
+EXPORT_FETCH_BATCH = 1024
+# Characters a JSON document can start with (including leading whitespace and
+# the NaN/Infinity literals the stdlib parser accepts).
+_JSON_START_CHARS = frozenset('{["-0123456789tfnNI \t\r\n')
 
 
 def export_project_lineage(conn, project_id: str) -> dict:
     """Export a project's lineage closure as a portable JSON-ready bundle."""
+    # One read transaction pins a single snapshot, so a concurrent writer cannot
+    # leave the bundle with edges and artefacts from different states.
+    with transaction(conn):
+        return _export_snapshot(conn, project_id)
+
+
+def _export_snapshot(conn, project_id: str) -> dict:
     project = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
     if not project:
         raise ValueError(f"Unknown project {project_id}")
@@ -24,14 +38,15 @@ def export_project_lineage(conn, project_id: str) -> dict:
     seed_ids = {row["artefact_id"] for row in seed_rows}
     artefact_ids = _expand_lineage(conn, seed_ids)
 
-    artefacts = _fetch_artefacts(conn, artefact_ids)
-    id_to_dna = {row["id"]: row["dna_token"] for row in artefacts}
-
-    tags = _fetch_tags(conn, artefact_ids)
-    notes = _fetch_notes(conn, artefact_ids)
-    events = _fetch_events(conn, artefact_ids)
-    edges = _fetch_edges(conn, artefact_ids, id_to_dna)
-    artefact_projects, related_project_ids = _fetch_artefact_projects(conn, artefact_ids)
+    # Bind the closure once as a JSON array; every fetch below filters on it via
+    # json_each instead of rebuilding an IN (?, ?, ...) placeholder list.
+    lineage_ids = jsonio.dumps(sorted(artefact_ids))
+    artefacts = _fetch_artefacts(conn, lineage_ids)
+    edges = _fetch_edges(conn, lineage_ids)
+    tags = _fetch_tags(conn, lineage_ids)
+    notes = _fetch_notes(conn, lineage_ids)
+    events = _fetch_events(conn, lineage_ids)
+    artefact_projects, related_project_ids = _fetch_artefact_projects(conn, lineage_ids)
     project_ids = set(related_project_ids)
     project_ids.add(project["id"])
     projects = _fetch_projects(conn, project_ids)
@@ -52,7 +67,7 @@ def export_project_lineage(conn, project_id: str) -> dict:
                 "created_at": row.get("created_at"),
                 "updated_at": row.get("updated_at"),
             }
-            for row in sorted(artefacts, key=lambda r: r["dna_token"])
+            for row in artefacts
         ],
         "tags": tags,
         "notes": notes,
@@ -83,44 +98,67 @@ def import_lineage(conn, bundle: dict, dry_run: bool = False) -> dict:
         "links_skipped": 0,
     }
 
-    context = nullcontext() if dry_run else conn
+    # Take the write lock before the prefetch reads so the existence snapshot
+    # cannot go stale and the import never has to upgrade a read lock mid-way
+    # (a SQLITE_BUSY risk under WAL). Joins a transaction the caller opened.
+    context = nullcontext() if dry_run else transaction(conn, immediate=True)
     dna_to_id: dict[str, int] = {}
     temp_id = -1
+    # Fallback timestamp for artefacts without their own; one import, one instant.
+    now_iso = datetime.now(timezone.utc).isoformat()
 
     with context:
-        for project in bundle.get("projects", []):
+        bundle_projects = bundle.get("projects", [])
+        existing_projects = {
+            row["id"]
+            for row in conn.execute(
+                "SELECT id FROM projects WHERE id IN (SELECT value FROM json_each(?))",
+                (jsonio.dumps([project["id"] for project in bundle_projects]),),
+            )
+        }
+        project_rows: list[tuple] = []
+        project_rows_default: list[tuple] = []
+        for project in bundle_projects:
             pid = project["id"]
-            existing = conn.execute("SELECT id FROM projects WHERE id = ?", (pid,)).fetchone()
-            if existing:
+            if pid in existing_projects:
                 stats["projects_existing"] += 1
                 continue
+            existing_projects.add(pid)
             stats["projects_new"] += 1
-            if dry_run:
-                continue
             if project.get("created_at"):
-                conn.execute(
-                    "INSERT INTO projects (id, name, description, created_at) VALUES (?, ?, ?, ?)",
-                    (pid, project.get("name"), project.get("description"), project.get("created_at")),
-                )
+                project_rows.append((pid, project.get("name"), project.get("description"), project.get("created_at")))
             else:
-                conn.execute(
-                    "INSERT INTO projects (id, name, description) VALUES (?, ?, ?)",
-                    (pid, project.get("name"), project.get("description")),
-                )
+                project_rows_default.append((pid, project.get("name"), project.get("description")))
+        if not dry_run:
+            _insert_many(
+                conn,
+                "INSERT INTO projects (id, name, description, created_at) VALUES (?, ?, ?, ?)",
+                project_rows,
+            )
+            _insert_many(
+                conn,
+                "INSERT INTO projects (id, name, description) VALUES (?, ?, ?)",
+                project_rows_default,
+            )
 
-        for artefact in bundle.get("artefacts", []):
+        bundle_artefacts = bundle.get("artefacts", [])
+        existing_artefacts = {
+            row["dna_token"]: row["id"]
+            for row in conn.execute(
+                "SELECT id, dna_token FROM artefacts WHERE dna_token IN (SELECT value FROM json_each(?))",
+                (jsonio.dumps([artefact["dna"] for artefact in bundle_artefacts]),),
+            )
+        }
+        for artefact in bundle_artefacts:
             dna = artefact["dna"]
-            existing = conn.execute(
-                "SELECT id FROM artefacts WHERE dna_token = ?",
-                (dna,),
-            ).fetchone()
-            if existing:
-                dna_to_id[dna] = existing["id"]
+            existing_id = existing_artefacts.get(dna)
+            if existing_id is not None:
+                dna_to_id[dna] = existing_id
                 stats["artefacts_existing"] += 1
                 continue
             stats["artefacts_new"] += 1
             if dry_run:
-                dna_to_id[dna] = temp_id
+                dna_to_id[dna] = existing_artefacts[dna] = temp_id
                 temp_id -= 1
                 continue
             created_at = artefact.get("created_at")
@@ -144,189 +182,220 @@ def import_lineage(conn, bundle: dict, dry_run: bool = False) -> dict:
                     fields[2],
                     fields[3],
                     fields[4],
-                    created_at or datetime.now(timezone.utc).isoformat(),
-                    updated_at or datetime.now(timezone.utc).isoformat(),
+                    created_at or now_iso,
+                    updated_at or now_iso,
                 ),
             )
-            dna_to_id[dna] = cur.lastrowid
+            dna_to_id[dna] = existing_artefacts[dna] = cur.lastrowid
+
+        # Existence checks below are answered from key sets loaded once per table
+        # rather than one SELECT per bundle row; sets grow as rows are inserted so
+        # duplicates within the bundle are skipped too.
+        known_ids = jsonio.dumps(sorted(i for i in dna_to_id.values() if i > 0))
+        existing_tags = {
+            (row["artefact_id"], row["tag"])
+            for row in conn.execute(
+                "SELECT artefact_id, tag FROM tags WHERE artefact_id IN (SELECT value FROM json_each(?))",
+                (known_ids,),
+            )
+        }
+        existing_notes: set[tuple] = set()
+        existing_note_texts: set[tuple] = set()
+        for row in conn.execute(
+            "SELECT artefact_id, note, created_at FROM notes WHERE artefact_id IN (SELECT value FROM json_each(?))",
+            (known_ids,),
+        ):
+            existing_notes.add((row["artefact_id"], row["note"], row["created_at"]))
+            existing_note_texts.add((row["artefact_id"], row["note"]))
+        existing_events = {
+            (
+                row["artefact_id"],
+                row["event_type"],
+                row["description"],
+                _canonical_stored_metadata(row["metadata"]),
+                row["created_at"],
+            )
+            for row in conn.execute(
+                """
+                SELECT artefact_id, event_type, description, metadata, created_at FROM events
+                WHERE artefact_id IN (SELECT value FROM json_each(?))
+                """,
+                (known_ids,),
+            )
+        }
+        existing_edges = {
+            (row["parent_id"], row["child_id"], row["relation_type"], row["reason"])
+            for row in conn.execute(
+                """
+                SELECT parent_id, child_id, relation_type, reason FROM edges
+                WHERE parent_id IN (SELECT value FROM json_each(?))
+                """,
+                (known_ids,),
+            )
+        }
+        existing_links = {
+            (row["artefact_id"], row["project_id"])
+            for row in conn.execute(
+                """
+                SELECT artefact_id, project_id FROM artefact_projects
+                WHERE artefact_id IN (SELECT value FROM json_each(?))
+                """,
+                (known_ids,),
+            )
+        }
 
+        # Rows are collected per statement shape and written with one executemany
+        # each; the surrounding transaction keeps them in a single commit.
+        tag_rows: list[tuple] = []
         for item in bundle.get("tags", []):
             art_id = _resolve_dna(dna_to_id, item["dna"])
             tag = item["tag"].lower()
-            exists = conn.execute(
-                "SELECT 1 FROM tags WHERE artefact_id = ? AND tag = ?",
-                (art_id, tag),
-            ).fetchone()
-            if exists:
+            if (art_id, tag) in existing_tags:
                 stats["tags_skipped"] += 1
                 continue
+            existing_tags.add((art_id, tag))
             stats["tags_inserted"] += 1
-            if not dry_run:
-                conn.execute(
-                    "INSERT INTO tags (artefact_id, tag) VALUES (?, ?)",
-                    (art_id, tag),
-                )
+            tag_rows.append((art_id, tag))
 
+        note_rows: list[tuple] = []
+        note_rows_default: list[tuple] = []
         for note in bundle.get("notes", []):
             art_id = _resolve_dna(dna_to_id, note["dna"])
             created_at = note.get("created_at")
             if created_at:
-                exists = conn.execute(
-                    """
-                    SELECT 1 FROM notes
-                    WHERE artefact_id = ? AND note = ? AND created_at = ?
-                    """,
-                    (art_id, note["note"], created_at),
-                ).fetchone()
+                exists = (art_id, note["note"], created_at) in existing_notes
             else:
-                params = (art_id, note["note"])
-                exists = conn.execute(
-                    """
-                    SELECT 1 FROM notes
-                    WHERE artefact_id = ? AND note = ?
-                    """,
-                    (art_id, note["note"]),
-                ).fetchone()
+                exists = (art_id, note["note"]) in existing_note_texts
             if exists:
                 stats["notes_skipped"] += 1
                 continue
-            stats["notes_inserted"] += 1
-            if dry_run:
-                continue
             if created_at:
-                conn.execute(
-                    "INSERT INTO notes (artefact_id, note, created_at) VALUES (?, ?, ?)",
-                    (art_id, note["note"], created_at),
-                )
+                existing_notes.add((art_id, note["note"], created_at))
+                note_rows.append((art_id, note["note"], created_at))
             else:
-                conn.execute(
-                    "INSERT INTO notes (artefact_id, note) VALUES (?, ?)",
-                    (art_id, note["note"]),
-                )
+                note_rows_default.append((art_id, note["note"]))
+            existing_note_texts.add((art_id, note["note"]))
+            stats["notes_inserted"] += 1
 
+        event_rows: list[tuple] = []
+        event_rows_default: list[tuple] = []
         for event in bundle.get("events", []):
             art_id = _resolve_dna(dna_to_id, event["dna"])
             metadata = event.get("metadata")
             canonical_meta = _canonical_metadata(metadata)
-            duplicate = _event_exists(
-                conn,
+            event_key = (
                 art_id,
                 event["event_type"],
                 event.get("description"),
                 canonical_meta,
                 event.get("created_at"),
             )
-            if duplicate:
+            if event_key in existing_events:
                 stats["events_skipped"] += 1
                 continue
+            existing_events.add(event_key)
             stats["events_inserted"] += 1
-            if dry_run:
-                continue
+            # Sorted-key JSON is both the canonical form and the stored form for
+            # dict/list metadata, so reuse it rather than serialising twice.
+            stored_meta = canonical_meta if isinstance(metadata, (dict, list)) else _dump_metadata(metadata)
+            row = (art_id, event["event_type"], event.get("description"), stored_meta)
             if event.get("created_at"):
-                conn.execute(
-                    """
-                    INSERT INTO events (artefact_id, event_type, description, metadata, created_at)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        art_id,
-                        event["event_type"],
-                        event.get("description"),
-                        _dump_metadata(metadata),
-                        event.get("created_at"),
-                    ),
-                )
+                event_rows.append(row + (event.get("created_at"),))
             else:
-                conn.execute(
-                    """
-                    INSERT INTO events (artefact_id, event_type, description, metadata)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (
-                        art_id,
-                        event["event_type"],
-                        event.get("description"),
-                        _dump_metadata(metadata),
-                    ),
-                )
+                event_rows_default.append(row)
 
+        edge_rows: list[tuple] = []
+        edge_rows_default: list[tuple] = []
         for edge in bundle.get("edges", []):
             parent_id = _resolve_dna(dna_to_id, edge["parent_dna"])
             child_id = _resolve_dna(dna_to_id, edge["child_dna"])
-            exists = conn.execute(
-                """
-                SELECT 1 FROM edges
-                WHERE parent_id = ? AND child_id = ? AND relation_type = ?
-                AND ((reason IS NULL AND ? IS NULL) OR reason = ?)
-                """,
-                (parent_id, child_id, edge.get("relation_type"), edge.get("reason"), edge.get("reason")),
-            ).fetchone()
-            if exists:
+            edge_key = (parent_id, child_id, edge.get("relation_type"), edge.get("reason"))
+            if edge_key in existing_edges:
                 stats["edges_skipped"] += 1
                 continue
+            existing_edges.add(edge_key)
             stats["edges_inserted"] += 1
-            if dry_run:
-                continue
             if edge.get("created_at"):
-                conn.execute(
-                    """
-                    INSERT INTO edges (parent_id, child_id, relation_type, reason, created_at)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        parent_id,
-                        child_id,
-                        edge.get("relation_type"),
-                        edge.get("reason"),
-                        edge.get("created_at"),
-                    ),
-                )
+                edge_rows.append(edge_key + (edge.get("created_at"),))
             else:
-                conn.execute(
-                    """
-                    INSERT INTO edges (parent_id, child_id, relation_type, reason)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (
-                        parent_id,
-                        child_id,
-                        edge.get("relation_type"),
-                        edge.get("reason"),
-                    ),
-                )
+                edge_rows_default.append(edge_key)
 
+        link_rows: list[tuple] = []
+        link_rows_default: list[tuple] = []
         for link in bundle.get("artefact_projects", []):
             art_id = _resolve_dna(dna_to_id, link["dna"])
-            exists = conn.execute(
-                """
-                SELECT 1 FROM artefact_projects
-                WHERE artefact_id = ? AND project_id = ?
-                """,
-                (art_id, link["project_id"]),
-            ).fetchone()
-            if exists:
+            if (art_id, link["project_id"]) in existing_links:
                 stats["links_skipped"] += 1
                 continue
+            existing_links.add((art_id, link["project_id"]))
             stats["links_inserted"] += 1
-            if dry_run:
-                continue
             if link.get("added_at"):
-                conn.execute(
-                    """
-                    INSERT INTO artefact_projects (artefact_id, project_id, added_at)
-                    VALUES (?, ?, ?)
-                    """,
-                    (art_id, link["project_id"], link.get("added_at")),
-                )
+                link_rows.append((art_id, link["project_id"], link.get("added_at")))
             else:
-                conn.execute(
-                    "INSERT INTO artefact_projects (artefact_id, project_id) VALUES (?, ?)",
-                    (art_id, link["project_id"]),
-                )
+                link_rows_default.append((art_id, link["project_id"]))
+
+        if not dry_run:
+            _insert_many(conn, "INSERT INTO tags (artefact_id, tag) VALUES (?, ?)", tag_rows)
+            _insert_many(
+                conn,
+                "INSERT INTO notes (artefact_id, note, created_at) VALUES (?, ?, ?)",
+                note_rows,
+            )
+            _insert_many(conn, "INSERT INTO notes (artefact_id, note) VALUES (?, ?)", note_rows_default)
+            _insert_many(
+                conn,
+                """
+                INSERT INTO events (artefact_id, event_type, description, metadata, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                event_rows,
+            )
+            _insert_many(
+                conn,
+                """
+                INSERT INTO events (artefact_id, event_type, description, metadata)
+                VALUES (?, ?, ?, ?)
+                """,
+                event_rows_default,
+            )
+            _insert_many(
+                conn,
+                """
+                INSERT INTO edges (parent_id, child_id, relation_type, reason, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                edge_rows,
+            )
+            _insert_many(
+                conn,
+                """
+                INSERT INTO edges (parent_id, child_id, relation_type, reason)
+                VALUES (?, ?, ?, ?)
+                """,
+                edge_rows_default,
+            )
+            _insert_many(
+                conn,
+                """
+                INSERT INTO artefact_projects (artefact_id, project_id, added_at)
+                VALUES (?, ?, ?)
+                """,
+                link_rows,
+            )
+            _insert_many(
+                conn,
+                "INSERT INTO artefact_projects (artefact_id, project_id) VALUES (?, ?)",
+                link_rows_default,
+            )
 
     return stats
 
 
+def _insert_many(conn, query: str, rows: list[tuple]) -> None:
+    if rows:
+        conn.executemany(query, rows)
+
+
 def _validate_bundle(bundle: dict) -> None:
     if not isinstance(bundle, dict):
         raise ValueError("Lineage bundle must be a dictionary.")
@@ -346,155 +415,144 @@ def _resolve_dna(mapping: dict[str, int], dna: str) -> int:
 def _expand_lineage(conn, seed_ids: set[int]) -> set[int]:
     if not seed_ids:
         return set()
-    result = set(seed_ids)
-    queue: deque[int] = deque(seed_ids)
-    while queue:
-        current = queue.popleft()
-        parents = conn.execute(
-            "SELECT parent_id FROM edges WHERE child_id = ?",
-            (current,),
-        ).fetchall()
-        for row in parents:
-            parent_id = row["parent_id"]
-            if parent_id not in result:
-                result.add(parent_id)
-                queue.append(parent_id)
-        children = conn.execute(
-            "SELECT child_id FROM edges WHERE parent_id = ?",
-            (current,),
-        ).fetchall()
-        for row in children:
-            child_id = row["child_id"]
-            if child_id not in result:
-                result.add(child_id)
-                queue.append(child_id)
-    return result
-
-
-def _fetch_artefacts(conn, artefact_ids: set[int]) -> list[dict]:
-    if not artefact_ids:
-        return []
-    sorted_ids = sorted(artefact_ids)
-    placeholders = ",".join("?" for _ in sorted_ids)
+    # One recursive CTE walks edges in both directions (served by idx_edges_child and
+    # idx_edges_parent) instead of two round-trips per visited node.
     cur = conn.execute(
-        f"SELECT * FROM artefacts WHERE id IN ({placeholders})",
-        tuple(sorted_ids),
+        """
+        WITH RECURSIVE closure(id) AS (
+            SELECT value FROM json_each(?)
+            UNION
+            SELECT CASE WHEN e.child_id = c.id THEN e.parent_id ELSE e.child_id END
+            FROM closure c
+            JOIN edges e ON e.child_id = c.id OR e.parent_id = c.id
+        )
+        SELECT id FROM closure
+        """,
+        (jsonio.dumps(sorted(seed_ids)),),
     )
-    return cur.fetchall()
+    return {row["id"] for row in cur.fetchall()}
 
 
-def _fetch_tags(conn, artefact_ids: set[int]) -> list[dict]:
-    if not artefact_ids:
-        return []
-    sorted_ids = sorted(artefact_ids)
-    placeholders = ",".join("?" for _ in sorted_ids)
+def _iter_rows(conn, query: str, params: tuple) -> Iterator[tuple]:
+    # Plain tuples in fetchmany batches: export queries can return tens of
+    # thousands of rows, and the connection's dict row factory costs a dict per row.
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.arraysize = EXPORT_FETCH_BATCH
+    cur.execute(query, params)
+    while True:
+        batch = cur.fetchmany()
+        if not batch:
+            return
+        yield from batch
+
+
+def _fetch_artefacts(conn, lineage_ids: str) -> list[dict]:
     cur = conn.execute(
-        f"""
+        "SELECT * FROM artefacts WHERE id IN (SELECT value FROM json_each(?)) ORDER BY dna_token",
+        (lineage_ids,),
+    )
+    return cur.fetchall()
+
+
+def _fetch_tags(conn, lineage_ids: str) -> list[dict]:
+    rows = _iter_rows(
+        conn,
+        """
         SELECT a.dna_token AS dna, t.tag
         FROM tags t
         JOIN artefacts a ON a.id = t.artefact_id
-        WHERE t.artefact_id IN ({placeholders})
+        WHERE t.artefact_id IN (SELECT value FROM json_each(?))
         ORDER BY a.dna_token, t.tag
         """,
-        tuple(sorted_ids),
+        (lineage_ids,),
     )
-    return cur.fetchall()
+    return [{"dna": dna, "tag": tag} for dna, tag in rows]
 
 
-def _fetch_notes(conn, artefact_ids: set[int]) -> list[dict]:
-    if not artefact_ids:
-        return []
-    sorted_ids = sorted(artefact_ids)
-    placeholders = ",".join("?" for _ in sorted_ids)
-    cur = conn.execute(
-        f"""
+def _fetch_notes(conn, lineage_ids: str) -> list[dict]:
+    rows = _iter_rows(
+        conn,
+        """
         SELECT a.dna_token AS dna, n.note, n.created_at
         FROM notes n
         JOIN artefacts a ON a.id = n.artefact_id
-        WHERE n.artefact_id IN ({placeholders})
+        WHERE n.artefact_id IN (SELECT value FROM json_each(?))
         ORDER BY n.created_at ASC
         """,
-        tuple(sorted_ids),
+        (lineage_ids,),
     )
-    return cur.fetchall()
+    return [{"dna": dna, "note": note, "created_at": created_at} for dna, note, created_at in rows]
 
 
-def _fetch_events(conn, artefact_ids: set[int]) -> list[dict]:
-    if not artefact_ids:
-        return []
-    sorted_ids = sorted(artefact_ids)
-    placeholders = ",".join("?" for _ in sorted_ids)
-    cur = conn.execute(
-        f"""
+def _fetch_events(conn, lineage_ids: str) -> list[dict]:
+    rows = _iter_rows(
+        conn,
+        """
         SELECT a.dna_token AS dna, e.event_type, e.description, e.metadata, e.created_at
         FROM events e
         JOIN artefacts a ON a.id = e.artefact_id
-        WHERE e.artefact_id IN ({placeholders})
+        WHERE e.artefact_id IN (SELECT value FROM json_each(?))
         ORDER BY e.created_at ASC
         """,
-        tuple(sorted_ids),
+        (lineage_ids,),
     )
-    rows = []
-    for row in cur.fetchall():
-        rows.append(
-            {
-                "dna": row["dna"],
-                "event_type": row["event_type"],
-                "description": row.get("description"),
-                "metadata": _safe_json_loads(row.get("metadata")),
-                "created_at": row.get("created_at"),
-            }
-        )
-    return rows
-
-
-def _fetch_edges(conn, artefact_ids: set[int], id_to_dna: dict[int, str]) -> list[dict]:
-    if not artefact_ids:
-        return []
-    sorted_ids = sorted(artefact_ids)
-    placeholders = ",".join("?" for _ in sorted_ids)
-    cur = conn.execute(
-        f"""
-        SELECT * FROM edges
-        WHERE parent_id IN ({placeholders}) OR child_id IN ({placeholders})
+    return [
+        {
+            "dna": dna,
+            "event_type": event_type,
+            "description": description,
+            "metadata": _safe_json_loads(metadata),
+            "created_at": created_at,
+        }
+        for dna, event_type, description, metadata, created_at in rows
+    ]
+
+
+def _fetch_edges(conn, lineage_ids: str) -> list[dict]:
+    # Both endpoints are constrained in SQL, so edges leaving the closure never
+    # reach Python; the id tiebreak keeps output stable for duplicate triples.
+    rows = _iter_rows(
+        conn,
+        """
+        SELECT p.dna_token AS parent_dna, c.dna_token AS child_dna,
+               e.relation_type, e.reason, e.created_at
+        FROM edges e
+        JOIN artefacts p ON p.id = e.parent_id
+        JOIN artefacts c ON c.id = e.child_id
+        WHERE e.parent_id IN (SELECT value FROM json_each(?1))
+        AND e.child_id IN (SELECT value FROM json_each(?1))
+        ORDER BY parent_dna, child_dna, COALESCE(e.relation_type, ''), e.id
         """,
-        tuple(sorted_ids) * 2,
+        (lineage_ids,),
     )
-    rows = []
-    for row in cur.fetchall():
-        if row["parent_id"] not in artefact_ids or row["child_id"] not in artefact_ids:
-            continue
-        rows.append(
-            {
-                "parent_dna": id_to_dna[row["parent_id"]],
-                "child_dna": id_to_dna[row["child_id"]],
-                "relation_type": row.get("relation_type"),
-                "reason": row.get("reason"),
-                "created_at": row.get("created_at"),
-            }
-        )
-    rows.sort(key=lambda r: (r["parent_dna"], r["child_dna"], r.get("relation_type") or ""))
-    return rows
-
-
-def _fetch_artefact_projects(conn, artefact_ids: set[int]) -> tuple[list[dict], set[str]]:
-    if not artefact_ids:
-        return [], set()
-    sorted_ids = sorted(artefact_ids)
-    placeholders = ",".join("?" for _ in sorted_ids)
-    cur = conn.execute(
-        f"""
+    return [
+        {
+            "parent_dna": parent_dna,
+            "child_dna": child_dna,
+            "relation_type": relation_type,
+            "reason": reason,
+            "created_at": created_at,
+        }
+        for parent_dna, child_dna, relation_type, reason, created_at in rows
+    ]
+
+
+def _fetch_artefact_projects(conn, lineage_ids: str) -> tuple[list[dict], set[str]]:
+    rows = _iter_rows(
+        conn,
+        """
         SELECT a.dna_token AS dna, ap.project_id, ap.added_at
         FROM artefact_projects ap
         JOIN artefacts a ON a.id = ap.artefact_id
-        WHERE ap.artefact_id IN ({placeholders})
+        WHERE ap.artefact_id IN (SELECT value FROM json_each(?))
         ORDER BY ap.project_id, a.dna_token
         """,
-        tuple(sorted_ids),
+        (lineage_ids,),
     )
-    rows = cur.fetchall()
-    project_ids = {row["project_id"] for row in rows}
-    return rows, project_ids
+    links = [{"dna": dna, "project_id": project_id, "added_at": added_at} for dna, project_id, added_at in rows]
+    project_ids = {link["project_id"] for link in links}
+    return links, project_ids
 
 
 def _fetch_projects(conn, project_ids: set[str]) -> list[dict]:
@@ -509,38 +567,10 @@ def _fetch_projects(conn, project_ids: set[str]) -> list[dict]:
     return cur.fetchall()
 
 
-def _event_exists(
-    conn,
-    artefact_id: int,
-    event_type: str,
-    description: str | None,
-    canonical_metadata: Any,
-    created_at: str | None,
-) -> bool:
-    rows = conn.execute(
-        """
-        SELECT event_type, description, metadata, created_at
-        FROM events WHERE artefact_id = ?
-        """,
-        (artefact_id,),
-    ).fetchall()
-    for row in rows:
-        if row["event_type"] != event_type:
-            continue
-        if row.get("description") != description:
-            continue
-        if row.get("created_at") != created_at:
-            continue
-        existing_meta = _canonical_metadata(_safe_json_loads(row.get("metadata")))
-        if existing_meta == canonical_metadata:
-            return True
-    return False
-
-
 def _dump_metadata(metadata: Any) -> str | None:
     if metadata is None:
         return None
-    return json.dumps(metadata, sort_keys=True)
+    return jsonio.dumps(metadata, sort_keys=True)
 
 
 def _safe_json_loads(value: Any) -> Any:
@@ -548,9 +578,12 @@ def _safe_json_loads(value: Any) -> Any:
         return None
     if isinstance(value, (dict, list)):
         return value
+    if isinstance(value, str) and (not value or value[0] not in _JSON_START_CHARS):
+        # Plain-text metadata: skip the parser and the exception it would raise.
+        return value
     try:
-        return json.loads(value)
-    except (json.JSONDecodeError, TypeError):
+        return jsonio.loads(value)
+    except (jsonio.JSONDecodeError, TypeError):
         return value
 
 
@@ -559,7 +592,13 @@ def _canonical_metadata(metadata: Any) -> Any:
         return None
     if isinstance(metadata, str):
         parsed = _safe_json_loads(metadata)
-        return json.dumps(parsed, sort_keys=True) if isinstance(parsed, (dict, list)) else metadata
+        return jsonio.dumps(parsed, sort_keys=True) if isinstance(parsed, (dict, list)) else metadata
     if isinstance(metadata, (dict, list)):
-        return json.dumps(metadata, sort_keys=True)
+        return jsonio.dumps(metadata, sort_keys=True)
     return metadata
+
+
+@lru_cache(maxsize=4096)
+def _canonical_stored_metadata(raw: str | None) -> Any:
+    # Events frequently share identical metadata text; memoise on the raw column value.
+    return _canonical_metadata(_safe_json_loads(raw))
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
+import os
 import sqlite3
 from pathlib import Path
 
+import click
 import pytest
+from typer.main import get_command
 
+from eng_dna import db as db_module
+from eng_dna.cli import app
 from eng_dna.db import connect, ensure_schema
 
 
+@pytest.fixture(autouse=True)
+def _fast_sqlite(monkeypatch) -> None:
+    # Test databases are disposable; skip fsyncs on every connection EDNA opens.
+    pragmas = (*db_module.CONNECTION_PRAGMAS, "PRAGMA synchronous = OFF;")
+    monkeypatch.setattr(db_module, "CONNECTION_PRAGMAS", pragmas)
+
+
 @pytest.fixture()
 def db(tmp_path: Path) -> sqlite3.Connection:
     path = tmp_path / "eng_dna.db"
@@ -17,8 +29,69 @@ def db(tmp_path: Path) -> sqlite3.Connection:
     conn.close()
 
 
+@pytest.fixture(scope="module")
+def memory_db() -> sqlite3.Connection:
+    """Private in-memory database with the schema applied, shared by a module."""
+    conn = connect("file::memory:")
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture()
+def rollback_db(memory_db: sqlite3.Connection) -> sqlite3.Connection:
+    """The module's in-memory database, with every write rolled back after the test.
+
+    EDNA helpers join the open savepoint transaction instead of committing, so
+    this only suits tests that neither commit (``with conn:``) nor need a
+    database file other connections can open.
+    """
+    memory_db.execute("SAVEPOINT test_case")
+    yield memory_db
+    memory_db.execute("ROLLBACK TO test_case")
+    memory_db.execute("RELEASE test_case")
+
+
+@pytest.fixture(scope="session")
+def cli_command() -> click.Command:
+    """The EDNA Typer app converted to its Click command tree once per session.
+
+    ``typer.testing.CliRunner.invoke`` rebuilds this tree on every call; CLI
+    tests invoke the cached command through ``click.testing.CliRunner``.
+    """
+    return get_command(app)
+
+
+@pytest.fixture()
+def cli_db(tmp_path: Path, monkeypatch) -> sqlite3.Connection:
+    """Connection to a per-test database that CLI invocations also resolve to."""
+    path = tmp_path / "eng_dna.db"
+    monkeypatch.setenv("EDNA_DB_PATH", str(path))
+    conn = connect(path)
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
 @pytest.fixture()
 def sample_file(tmp_path: Path) -> Path:
     path = tmp_path / "sample.txt"
     path.write_text("hello world", encoding="utf-8")
     return path
+
+
+@pytest.fixture()
+def age_file():
+    """Return a helper that backdates a file's mtime so its stat signature counts as settled.
+
+    The helper returns the new ``st_mtime_ns``; the default age is well past
+    ``identity.MTIME_SETTLE_NS``.
+    """
+
+    def _age(path: Path, seconds: int = 60) -> int:
+        stat = path.stat()
+        mtime_ns = stat.st_mtime_ns - seconds * 1_000_000_000
+        os.utime(path, ns=(stat.st_atime_ns, mtime_ns))
+        return mtime_ns
+
+    return _age
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import pytest
+
+from eng_dna.db import SCHEMA_VERSION, connect, ensure_schema, transaction
+
+
+def test_connect_accepts_shared_memory_uri() -> None:
+    uri = "file:edna-shared-test?mode=memory&cache=shared"
+    first = connect(uri)
+    second = connect(uri)
+    try:
+        ensure_schema(first)
+        with first:
+            first.execute("INSERT INTO projects (id, name) VALUES ('p', 'P')")
+        assert second.execute("SELECT name FROM projects").fetchone()["name"] == "P"
+    finally:
+        first.close()
+        second.close()
+
+
+def test_ensure_schema_stamps_user_version_and_upgrades_older_databases(tmp_path) -> None:
+    conn = connect(tmp_path / "eng_dna.db")
+    try:
+        ensure_schema(conn)
+        assert conn.execute("PRAGMA user_version").fetchone()["user_version"] == SCHEMA_VERSION
+
+        conn.execute("DROP INDEX idx_tags_tag")
+        ensure_schema(conn)
+        assert not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'idx_tags_tag'"
+        ).fetchone()
+
+        conn.execute("PRAGMA user_version = 0")
+        ensure_schema(conn)
+        assert conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'idx_tags_tag'"
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def test_transaction_joins_outer_and_rolls_back_as_a_unit(db) -> None:
+    with pytest.raises(RuntimeError):
+        with transaction(db, immediate=True):
+            with transaction(db):
+                db.execute("INSERT INTO projects (id, name) VALUES ('inner', 'Inner')")
+            assert db.in_transaction
+            raise RuntimeError("abort")
+    assert not db.in_transaction
+    assert db.execute("SELECT COUNT(*) AS c FROM projects").fetchone()["c"] == 0
+
+    with transaction(db):
+        db.execute("INSERT INTO projects (id, name) VALUES ('kept', 'Kept')")
+    assert not db.in_transaction
+    assert db.execute("SELECT id FROM projects").fetchone()["id"] == "kept"
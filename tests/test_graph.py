@@ -7,11 +7,11 @@ from eng_dna import operations
 
 def _create_lineage(db, tmp_path: Path) -> tuple[dict, dict, dict]:
     parent_path = tmp_path / "parent.txt"
-    parent_path.write_text("parent", encoding="utf-8")
     child_path = tmp_path / "child.txt"
-    child_path.write_text("child", encoding="utf-8")
     grandchild_path = tmp_path / "grandchild.txt"
-    grandchild_path.write_text("grandchild", encoding="utf-8")
+    parent_path.write_bytes(b"parent")
+    child_path.write_bytes(b"child")
+    grandchild_path.write_bytes(b"grandchild")
 
     parent = operations.tag_file(
         db,
@@ -20,6 +20,7 @@ def _create_lineage(db, tmp_path: Path) -> tuple[dict, dict, dict]:
         description=None,
         tags=None,
         project_ids=None,
+        content=b"parent",
     )
     child = operations.tag_file(
         db,
@@ -28,6 +29,7 @@ def _create_lineage(db, tmp_path: Path) -> tuple[dict, dict, dict]:
         description=None,
         tags=None,
         project_ids=None,
+        content=b"child",
     )
     grandchild = operations.tag_file(
         db,
@@ -36,6 +38,7 @@ def _create_lineage(db, tmp_path: Path) -> tuple[dict, dict, dict]:
         description=None,
         tags=None,
         project_ids=None,
+        content=b"grandchild",
     )
     operations.link_artefacts(db, child, [parent], relation_type="derived_from", reason="unit test")
     operations.link_artefacts(db, grandchild, [child], relation_type="derived_from", reason="unit test")
@@ -65,6 +68,17 @@ def test_build_lineage_graph_descendants(db, tmp_path: Path) -> None:
     }
 
 
+def test_build_lineage_graph_full_emits_each_edge_once(db, tmp_path: Path) -> None:
+    parent, child, grandchild = _create_lineage(db, tmp_path)
+
+    nodes, edges = operations.build_lineage_graph(db, child, scope="full")
+
+    assert set(nodes) == {parent["id"], child["id"], grandchild["id"]}
+    assert sorted((e.parent_id, e.child_id) for e in edges) == sorted(
+        [(parent["id"], child["id"]), (child["id"], grandchild["id"])]
+    )
+
+
 def test_formatters() -> None:
     nodes = {
         1: operations.LineageNode(id=1, dna_token="edna_abcd12345678", path="/tmp/setup.py", type="script"),
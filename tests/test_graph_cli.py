@@ -1,18 +1,14 @@
 from __future__ import annotations
 
-from typer.testing import CliRunner
+from click.testing import CliRunner
 
 from eng_dna import operations
-from eng_dna.cli import app
-from eng_dna.db import connect, ensure_schema
 
 runner = CliRunner()
 
 
-def test_graph_cli_mermaid(tmp_path, monkeypatch) -> None:
-    db_path = tmp_path / "eng_dna.db"
-    conn = connect(db_path)
-    ensure_schema(conn)
+def test_graph_cli_mermaid(tmp_path, cli_db, cli_command) -> None:
+    conn = cli_db
 
     parent_path = tmp_path / "parent.txt"
     parent_path.write_text("parent", encoding="utf-8")
@@ -36,18 +32,14 @@ def test_graph_cli_mermaid(tmp_path, monkeypatch) -> None:
         project_ids=None,
     )
     operations.link_artefacts(conn, child, [parent], relation_type="derived_from", reason=None)
-    conn.close()
 
-    monkeypatch.setenv("EDNA_DB_PATH", str(db_path))
-    result = runner.invoke(app, ["graph", str(child_path)])
+    result = runner.invoke(cli_command, ["graph", str(child_path)], catch_exceptions=False)
     assert result.exit_code == 0, result.stdout
     assert "flowchart LR" in result.stdout
 
 
-def test_unlink_cli(tmp_path, monkeypatch) -> None:
-    db_path = tmp_path / "eng_dna.db"
-    conn = connect(db_path)
-    ensure_schema(conn)
+def test_unlink_cli(tmp_path, cli_db, cli_command) -> None:
+    conn = cli_db
 
     parent_path = tmp_path / "parent.txt"
     parent_path.write_text("parent", encoding="utf-8")
@@ -71,15 +63,17 @@ def test_unlink_cli(tmp_path, monkeypatch) -> None:
         project_ids=None,
     )
     operations.link_artefacts(conn, child, [parent], relation_type="derived_from", reason=None)
-    conn.close()
 
-    monkeypatch.setenv("EDNA_DB_PATH", str(db_path))
-    result = runner.invoke(app, ["unlink", str(child_path), "--from", str(parent_path)])
+    result = runner.invoke(
+        cli_command, ["unlink", str(child_path), "--from", str(parent_path)], catch_exceptions=False
+    )
     assert result.exit_code == 0, result.stdout
     assert "Unlinked" in result.stdout
     assert parent["dna_token"] in result.stdout
     assert child["dna_token"] in result.stdout
 
-    second = runner.invoke(app, ["unlink", str(child_path), "--from", str(parent_path)])
+    second = runner.invoke(
+        cli_command, ["unlink", str(child_path), "--from", str(parent_path)], catch_exceptions=False
+    )
     assert second.exit_code == 0, second.stdout
     assert "No matching links removed" in second.stdout
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from eng_dna import operations
+
+
+def _cached_paths(conn) -> list[str]:
+    return [row["path"] for row in conn.execute("SELECT path FROM hash_cache ORDER BY path")]
+
+
+def _tag(conn, path: Path) -> dict:
+    return operations.tag_file(conn, path, artefact_type="text", description=None, tags=None, project_ids=None)
+
+
+@pytest.fixture()
+def settled_file(age_file):
+    def _write(path: Path, text: str) -> Path:
+        path.write_text(text, encoding="utf-8")
+        age_file(path)
+        return path
+
+    return _write
+
+
+@pytest.fixture(autouse=True)
+def _empty_memo():
+    operations._hash_memo.clear()
+    yield
+    operations._hash_memo.clear()
+
+
+def test_cache_row_is_rolled_back_with_failed_tag(db, tmp_path: Path, settled_file, monkeypatch) -> None:
+    target = settled_file(tmp_path / "part.txt", "part")
+
+    def _boom(*_args, **_kwargs):
+        raise RuntimeError("sidecar write failed")
+
+    monkeypatch.setattr(operations, "write_identity", _boom)
+    with pytest.raises(RuntimeError):
+        _tag(db, target)
+
+    assert _cached_paths(db) == []
+    assert db.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"] == 0
+
+
+def test_resolve_does_not_write_cache(db, tmp_path: Path, settled_file) -> None:
+    target = settled_file(tmp_path / "part.txt", "part")
+    _tag(db, target)
+    db.execute("DELETE FROM hash_cache")
+    db.commit()
+    operations._hash_memo.clear()
+    # Without the sidecar's stat signature, resolve has to hash the file.
+    target.with_name(target.name + ".edna").unlink()
+
+    operations.resolve_file_reference(db, target)
+
+    assert _cached_paths(db) == []
+
+
+def test_move_drops_cache_row_for_old_path(db, tmp_path: Path, settled_file) -> None:
+    target = settled_file(tmp_path / "part.txt", "part")
+    _tag(db, target)
+    assert _cached_paths(db) == [str(target.resolve())]
+
+    moved = tmp_path / "moved.txt"
+    target.rename(moved)
+    target.with_name(target.name + ".edna").rename(moved.with_name(moved.name + ".edna"))
+    _tag(db, moved)
+
+    assert _cached_paths(db) == [str(moved.resolve())]
+
+
+def test_rescan_drops_cache_rows_for_deleted_files(db, tmp_path: Path, settled_file) -> None:
+    kept = settled_file(tmp_path / "kept.txt", "kept")
+    removed = settled_file(tmp_path / "removed.txt", "removed")
+    _tag(db, kept)
+    _tag(db, removed)
+    assert len(_cached_paths(db)) == 2
+
+    removed.unlink()
+    operations.rescan_tree(db, tmp_path)
+
+    assert _cached_paths(db) == [str(kept.resolve())]
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
-from eng_dna import artefacts
-from eng_dna.identity import compute_file_hash, generate_dna_token, looks_like_dna
+from eng_dna import artefacts, identity
+from eng_dna.identity import (
+    compute_bytes_hash,
+    compute_file_hash,
+    generate_dna_token,
+    looks_like_dna,
+    normalize_path,
+)
 
 
 def test_compute_hash_and_dna(sample_file) -> None:
@@ -10,6 +16,15 @@ def test_compute_hash_and_dna(sample_file) -> None:
     dna = generate_dna_token()
     assert dna.startswith("edna_")
     assert looks_like_dna(dna)
+    assert compute_bytes_hash(sample_file.read_bytes()) == digest
+
+
+def test_compute_hash_streams_large_files(sample_file, monkeypatch) -> None:
+    small = compute_file_hash(sample_file)
+    monkeypatch.setattr(identity, "SMALL_FILE_HASH_BYTES", 0)
+    assert compute_file_hash(sample_file) == small
+    monkeypatch.setattr(identity, "_HAS_FILE_DIGEST", False)
+    assert compute_file_hash(sample_file, chunk_size=3) == small
 
 
 def test_lookup_helpers(db, sample_file) -> None:
@@ -29,3 +44,15 @@ def test_lookup_helpers(db, sample_file) -> None:
     assert by_path["dna_token"] == dna
     by_hash = artefacts.lookup_by_hash(db, digest)
     assert by_hash["path"] == by_path["path"]
+
+
+def test_normalize_path_skips_already_resolved_paths(tmp_path, monkeypatch) -> None:
+    resolved = normalize_path(tmp_path / "a" / ".." / "b.txt")
+    assert resolved == str((tmp_path / "b.txt").resolve())
+
+    def _no_resolve(self, strict=False):
+        raise AssertionError("resolved twice")
+
+    monkeypatch.setattr(type(tmp_path), "resolve", _no_resolve)
+    assert normalize_path(resolved) is resolved
+
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+
+from eng_dna import jsonio, sidecar, sync
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the optional extra
+    orjson = None
+
+PAYLOAD = {"z": [1, 2.5, None], "name": "Maß", "a": {"b": True}}
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def backend(request, monkeypatch) -> str:
+    if request.param == "orjson":
+        if orjson is None:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(jsonio, "orjson", orjson)
+    else:
+        monkeypatch.setattr(jsonio, "orjson", None)
+    return request.param
+
+
+def test_serialisation_is_canonical_for_every_backend(backend) -> None:
+    assert jsonio.dumps(PAYLOAD, sort_keys=True) == '{"a":{"b":true},"name":"Maß","z":[1,2.5,null]}'
+    assert jsonio.dumps_bytes(PAYLOAD) == '{"z":[1,2.5,null],"name":"Maß","a":{"b":true}}'.encode("utf-8")
+    assert jsonio.loads(jsonio.dumps_bytes(PAYLOAD)) == PAYLOAD
+    assert sync._canonical_metadata('{"b": 1, "a": "é"}') == '{"a":"é","b":1}'
+
+
+def test_sidecar_bytes_do_not_depend_on_backend(backend, tmp_path) -> None:
+    data = tmp_path / "Maß.txt"
+    data.write_text("x", encoding="utf-8")
+    sidecar.write_identity(data, "edna_ß", "h", None, "/stored/Maß.txt")
+
+    raw = sidecar.get_sidecar_path(data).read_bytes()
+    assert raw == '{"dna":"edna_ß","hash":"h","type":null,"path":"/stored/Maß.txt"}'.encode("utf-8")
+    sidecar.clear_sidecar_cache()
+    assert sidecar.read_identity(data).dna_token == "edna_ß"
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ('{"n": 123456789012345678901234567890}', {"n": 123456789012345678901234567890}),
+        ("[18446744073709551616, -9223372036854775809]", [18446744073709551616, -9223372036854775809]),
+        ('{"x": NaN}', {"x": float("nan")}),
+        ("[Infinity, -Infinity]", [float("inf"), float("-inf")]),
+    ],
+)
+def test_loads_matches_stdlib_for_every_backend(backend, raw, expected) -> None:
+    for data in (raw, raw.encode("utf-8")):
+        parsed = jsonio.loads(data)
+        assert repr(parsed) == repr(expected)
+        assert repr(sync._safe_json_loads(raw)) == repr(expected)
+
+
+def test_loads_still_rejects_malformed_input(backend) -> None:
+    with pytest.raises(jsonio.JSONDecodeError):
+        jsonio.loads(b"{not json")
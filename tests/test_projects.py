@@ -2,11 +2,10 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from typer.testing import CliRunner
+import pytest
+from click.testing import CliRunner
 
 from eng_dna import artefacts, operations
-from eng_dna.cli import app
-from eng_dna.db import connect, ensure_schema
 
 runner = CliRunner()
 
@@ -28,17 +27,31 @@ def test_project_files_listing(db, tmp_path: Path) -> None:
     assert files[0]["path"].endswith("wing.md")
 
 
-def test_project_list_cli(tmp_path, monkeypatch) -> None:
-    db_path = tmp_path / "eng_dna.db"
-    conn = connect(db_path)
-    ensure_schema(conn)
+def test_assign_projects_rejects_unknown_project_atomically(db) -> None:
+    artefacts.create_project(db, "known", "Known", None)
+    artefact = artefacts.create_artefact(
+        db,
+        dna_token="edna_assign_check",
+        path="/assign/check.txt",
+        file_hash="hash-assign",
+        artefact_type=None,
+        description=None,
+    )
+    with pytest.raises(ValueError, match="'missing' does not exist"):
+        artefacts.assign_projects(db, artefact["id"], ["known", "missing"])
+    assert artefacts.list_projects(db, artefact["id"]) == []
+
+    artefacts.assign_projects(db, artefact["id"], ["known", "known"])
+    assert [project["id"] for project in artefacts.list_projects(db, artefact["id"])] == ["known"]
+
+
+def test_project_list_cli(cli_db, cli_command) -> None:
+    conn = cli_db
     artefacts.create_project(conn, "zeta", "Zeta", "")
     artefacts.create_project(conn, "alpha", "Alpha", "")
     artefacts.create_project(conn, "mu", "Mu", None)
-    conn.close()
 
-    monkeypatch.setenv("EDNA_DB_PATH", str(db_path))
-    result = runner.invoke(app, ["project", "list"])
+    result = runner.invoke(cli_command, ["project", "list"], catch_exceptions=False)
     assert result.exit_code == 0, result.stdout
     lines = [line for line in result.stdout.splitlines() if line.strip()]
     assert lines == [
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from eng_dna import artefacts, operations
+from eng_dna import artefacts, operations, sidecar
 
 
 def test_sidecar_recreated_when_missing(db, tmp_path: Path) -> None:
@@ -28,5 +29,196 @@ def test_sidecar_recreated_when_missing(db, tmp_path: Path) -> None:
     assert restored["id"] == artefact["id"] or restored["dna_token"] == artefact["dna_token"]
     assert (moved.with_name(moved.name + ".edna")).exists()
 
-    events = artefacts.list_events(db, restored["id"])
-    assert any(event["event_type"] == "sidecar_restored" for event in events)
+    assert artefacts.has_event(db, restored["id"], "sidecar_restored")
+
+
+def test_resolve_skips_hash_for_unchanged_settled_file(db, tmp_path: Path, monkeypatch, age_file) -> None:
+    data = tmp_path / "mesh.dat"
+    data.write_bytes(b"mesh")
+    age_file(data)
+    artefact = operations.tag_file(
+        db,
+        data,
+        artefact_type="mesh",
+        description=None,
+        tags=None,
+        project_ids=None,
+    )
+
+    # Empty the hash cache so only the sidecar's stat signature can skip the read.
+    operations._hash_memo.clear()
+    with db:
+        db.execute("DELETE FROM hash_cache")
+
+    def _fail(*_args, **_kwargs):
+        raise AssertionError("hash should not be recomputed")
+
+    monkeypatch.setattr(operations, "compute_file_hash", _fail)
+    resolved = operations.resolve_file_reference(db, data)
+    assert resolved["id"] == artefact["id"]
+
+
+def test_resolve_rehashes_when_stat_changes(db, tmp_path: Path, monkeypatch, age_file) -> None:
+    data = tmp_path / "mesh.dat"
+    data.write_bytes(b"mesh")
+    age_file(data, seconds=120)
+    operations.tag_file(
+        db,
+        data,
+        artefact_type="mesh",
+        description=None,
+        tags=None,
+        project_ids=None,
+    )
+
+    data.write_bytes(b"mesh-v2")
+    age_file(data)
+    hashed: list[Path] = []
+    original = operations.compute_file_hash
+
+    def _counting(path, *args, **kwargs):
+        hashed.append(path)
+        return original(path, *args, **kwargs)
+
+    monkeypatch.setattr(operations, "compute_file_hash", _counting)
+    operations.resolve_file_reference(db, data)
+    assert hashed == [data.resolve()]
+
+
+def test_sidecar_reads_are_cached_until_rewritten(tmp_path: Path, monkeypatch, age_file) -> None:
+    data = tmp_path / "part.step"
+    data.write_text("solid")
+    sidecar.write_identity(data, "edna_cached", "hash-1", "cad", str(data))
+    age_file(sidecar.get_sidecar_path(data))
+    sidecar.clear_sidecar_cache()
+
+    first = sidecar.read_identity(data)
+    parsed: list[bytes] = []
+    original = sidecar._loads
+
+    def _counting(blob):
+        parsed.append(blob)
+        return original(blob)
+
+    monkeypatch.setattr(sidecar, "_loads", _counting)
+    assert sidecar.read_identity(data) == first
+    assert parsed == []
+
+    sidecar.write_identity(data, "edna_cached", "hash-2", "cad", str(data))
+    age_file(sidecar.get_sidecar_path(data))
+    assert sidecar.read_identity(data).file_hash == "hash-2"
+    assert len(parsed) == 1
+
+
+def test_embedded_marker_read_from_tail_of_large_file(tmp_path: Path) -> None:
+    handler = sidecar.COMMENT_HANDLERS[".txt"]
+    data = tmp_path / "log.txt"
+    body = "".join(f"line {i}\n" for i in range(20_000))
+    marker = sidecar._format_marker({"dna": "edna_tail", "hash": "h", "path": str(data)}, handler)
+    data.write_text(body + marker + "\n", encoding="utf-8")
+
+    info = sidecar.read_identity(data)
+
+    assert info is not None
+    assert info.dna_token == "edna_tail"
+
+
+def test_comment_handler_lookup_ignores_suffix_case() -> None:
+    assert sidecar._handler_for_suffix(".PY") is sidecar.COMMENT_HANDLERS[".py"]
+    assert sidecar._handler_for_suffix(".Md") is sidecar.COMMENT_HANDLERS[".md"]
+    assert sidecar._handler_for_suffix(".stl") is None
+
+
+def test_embedded_marker_rewritten_in_place(tmp_path: Path) -> None:
+    handler = sidecar.COMMENT_HANDLERS[".py"]
+    data = tmp_path / "solver.py"
+    data.write_text("print('hi')\n", encoding="utf-8")
+
+    sidecar._write_embedded_identity(data, handler, {"dna": "edna_one", "hash": "h1", "path": str(data)})
+    sidecar._write_embedded_identity(data, handler, {"dna": "edna_two", "hash": "h2", "path": str(data)})
+
+    lines = data.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "print('hi')"
+    assert len(lines) == 2
+    assert sidecar.read_identity(data).dna_token == "edna_two"
+
+    data.write_text(data.read_text(encoding="utf-8") + "print('after')\n", encoding="utf-8")
+    sidecar._write_embedded_identity(data, handler, {"dna": "edna_three", "hash": "h3", "path": str(data)})
+    lines = data.read_text(encoding="utf-8").splitlines()
+    assert lines == ["print('hi')", "print('after')", lines[-1]]
+    assert sidecar.read_identity(data).dna_token == "edna_three"
+
+
+def test_sidecar_rewrite_replaces_file_without_leftovers(tmp_path: Path) -> None:
+    data = tmp_path / "part.step"
+    data.write_text("solid")
+    sidecar.write_identity(data, "edna_atomic", "hash-1", "cad", str(data))
+    sidecar.write_identity(data, "edna_atomic", "hash-2", "cad", str(data))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["part.step", "part.step.edna"]
+    sidecar.clear_sidecar_cache()
+    assert sidecar.read_identity(data).file_hash == "hash-2"
+
+
+def test_supplied_content_hash_is_not_paired_with_file_signature(db, tmp_path: Path, monkeypatch, age_file) -> None:
+    data = tmp_path / "mesh.dat"
+    data.write_bytes(b"real")
+    age_file(data)
+    operations.tag_file(
+        db, data, artefact_type="mesh", description=None, tags=None, project_ids=None, content=b"fake"
+    )
+    sidecar.clear_sidecar_cache()
+    assert sidecar.read_identity(data).mtime_ns is None
+
+    hashed: list[Path] = []
+    original = operations.compute_file_hash
+
+    def _counting(path, *args, **kwargs):
+        hashed.append(path)
+        return original(path, *args, **kwargs)
+
+    monkeypatch.setattr(operations, "compute_file_hash", _counting)
+    operations.resolve_file_reference(db, data)
+    assert hashed == [data.resolve()]
+
+
+def test_rescan_leaves_current_sidecars_untouched(db, tmp_path: Path, age_file) -> None:
+    data = tmp_path / "mesh.dat"
+    data.write_bytes(b"mesh")
+    age_file(data)
+    operations.tag_file(db, data, artefact_type="mesh", description=None, tags=None, project_ids=None)
+    before = sidecar.get_sidecar_path(data).stat()
+
+    operations.rescan_tree(db, tmp_path)
+
+    after = sidecar.get_sidecar_path(data).stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_current_embedded_marker_is_not_rewritten(tmp_path: Path, monkeypatch, age_file) -> None:
+    monkeypatch.setattr(sidecar, "EMBED_ENABLED", True)
+    data = tmp_path / "notes.txt"
+    data.write_text("body\n", encoding="utf-8")
+    sidecar.write_identity(data, "edna_marker", "h1", "text", str(data))
+    age_file(data)
+    before = data.stat().st_mtime_ns
+
+    sidecar.write_identity(data, "edna_marker", "h1", "text", str(data))
+
+    assert data.stat().st_mtime_ns == before
+
+
+def test_concurrent_sidecar_writes_do_not_share_a_temp_file(tmp_path: Path) -> None:
+    data = tmp_path / "part.step"
+    data.write_text("solid")
+
+    def _write(i: int) -> None:
+        for _ in range(25):
+            sidecar.write_identity(data, "edna_threads", f"hash-{i}", "cad", str(data))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(_write, range(8)))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["part.step", "part.step.edna"]
+    sidecar.clear_sidecar_cache()
+    assert sidecar.read_identity(data).file_hash.startswith("hash-")
@@ -1,54 +1,63 @@
 from __future__ import annotations
 
+import copy
+import sqlite3
 from pathlib import Path
 
+import pytest
+
 from eng_dna import artefacts, sync
-from eng_dna.db import connect, ensure_schema
+from eng_dna.db import connect, ensure_schema, transaction
 
 DNA_PARENT = "edna_demo_parent"
 DNA_CHILD = "edna_demo_child"
 
 
 def _make_conn(path: Path):
-    conn = connect(path)
+    # Bundle round-trips never touch the filesystem; a named shared-cache
+    # in-memory database lives until its last connection closes.
+    conn = connect(f"file:{path.parent.name}-{path.stem}?mode=memory&cache=shared")
     ensure_schema(conn)
     return conn
 
 
 def _seed_lineage(conn):
-    artefacts.create_project(conn, "demo", "Demo Build", "Primary handoff")
-    artefacts.create_project(conn, "aux", "Aux Build", None)
-    parent = artefacts.create_artefact(
-        conn,
-        dna_token=DNA_PARENT,
-        path="/export/parent.txt",
-        file_hash="hash-parent",
-        artefact_type="design",
-        description="root design",
-    )
-    child = artefacts.create_artefact(
-        conn,
-        dna_token=DNA_CHILD,
-        path="/export/child.txt",
-        file_hash="hash-child",
-        artefact_type="report",
-        description="derived report",
-    )
-    artefacts.assign_projects(conn, parent["id"], ["demo"])
-    artefacts.assign_projects(conn, child["id"], ["demo", "aux"])
-    artefacts.add_tags(conn, parent["id"], ["baseline"])
-    with conn:
+    # The artefacts helpers join an open transaction, so the whole seed costs
+    # one commit while still writing exactly the rows the helpers write.
+    with transaction(conn):
+        artefacts.create_project(conn, "demo", "Demo Build", "Primary handoff")
+        artefacts.create_project(conn, "aux", "Aux Build", None)
+        parent = artefacts.create_artefact(
+            conn,
+            dna_token=DNA_PARENT,
+            path="/export/parent.txt",
+            file_hash="hash-parent",
+            artefact_type="design",
+            description="root design",
+        )
+        child = artefacts.create_artefact(
+            conn,
+            dna_token=DNA_CHILD,
+            path="/export/child.txt",
+            file_hash="hash-child",
+            artefact_type="report",
+            description="derived report",
+        )
+        artefacts.assign_projects(conn, parent["id"], ["demo"])
+        artefacts.assign_projects(conn, child["id"], ["demo", "aux"])
+        artefacts.add_tags(conn, parent["id"], ["baseline"])
+        # Notes have no artefacts helper; they are only written by lineage import.
         conn.execute(
             "INSERT INTO notes (artefact_id, note, created_at) VALUES (?, ?, ?)",
             (parent["id"], "remember this", "2024-01-01T12:00:00Z"),
         )
-    artefacts.create_edge(
-        conn,
-        parent_id=parent["id"],
-        child_id=child["id"],
-        relation_type="derived_from",
-        reason="handoff",
-    )
+        artefacts.create_edge(
+            conn,
+            parent_id=parent["id"],
+            child_id=child["id"],
+            relation_type="derived_from",
+            reason="handoff",
+        )
     return parent, child
 
 
@@ -61,6 +70,29 @@ def _build_bundle(tmp_path: Path) -> dict:
         conn.close()
 
 
+@pytest.fixture(scope="module")
+def schema_template():
+    template = sqlite3.connect(":memory:")
+    ensure_schema(template)
+    yield template
+    template.close()
+
+
+@pytest.fixture()
+def dest_db(schema_template, request):
+    # Copy the pre-built empty schema page-for-page instead of replaying DDL.
+    conn = connect(f"file:{request.node.name}-dest?mode=memory&cache=shared")
+    schema_template.backup(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def lineage_bundle(tmp_path_factory) -> dict:
+    # import_lineage never mutates its bundle, so one export serves the module.
+    return _build_bundle(tmp_path_factory.mktemp("bundle"))
+
+
 def test_export_project_lineage_basic(db):
     _seed_lineage(db)
     bundle = sync.export_project_lineage(db, "demo")
@@ -74,19 +106,97 @@ def test_export_project_lineage_basic(db):
     assert len(bundle["artefact_projects"]) == 3
 
 
-def test_import_lineage_creates_missing_records(tmp_path):
-    bundle = _build_bundle(tmp_path)
-    dest = _make_conn(tmp_path / "dest.db")
-    try:
-        stats = sync.import_lineage(dest, bundle)
-        assert stats["projects_new"] == 2
-        assert stats["artefacts_new"] == 2
-        parent = dest.execute(
-            "SELECT path FROM artefacts WHERE dna_token = ?",
-            (DNA_PARENT,),
-        ).fetchone()
-        assert parent["path"] == "/export/parent.txt"
-        tag = dest.execute(
+def test_export_includes_transitive_lineage(db):
+    parent, child = _seed_lineage(db)
+    grandchild = artefacts.create_artefact(
+        db,
+        dna_token="edna_demo_grandchild",
+        path="/export/grandchild.txt",
+        file_hash="hash-grandchild",
+        artefact_type="report",
+        description="unlinked to any project",
+    )
+    artefacts.create_edge(db, parent_id=child["id"], child_id=grandchild["id"], relation_type="derived_from")
+    artefacts.create_artefact(
+        db,
+        dna_token="edna_demo_unrelated",
+        path="/export/unrelated.txt",
+        file_hash="hash-unrelated",
+        artefact_type="report",
+        description=None,
+    )
+
+    bundle = sync.export_project_lineage(db, "demo")
+
+    assert {art["dna"] for art in bundle["artefacts"]} == {DNA_PARENT, DNA_CHILD, "edna_demo_grandchild"}
+    assert len(bundle["edges"]) == 2
+
+
+def _preseed_local_parent(conn):
+    artefacts.create_project(conn, "demo", "Local Demo", None)
+    existing = artefacts.create_artefact(
+        conn,
+        dna_token=DNA_PARENT,
+        path="/local/parent.txt",
+        file_hash="local-hash",
+        artefact_type="design",
+        description="local copy",
+    )
+    artefacts.assign_projects(conn, existing["id"], ["demo"])
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        pytest.param(
+            {
+                "expected": {"projects_new": 2, "artefacts_new": 2},
+                "paths": {DNA_PARENT: "/export/parent.txt", DNA_CHILD: "/export/child.txt"},
+            },
+            id="creates-missing-records",
+        ),
+        pytest.param(
+            {
+                "preseed": True,
+                "expected": {"artefacts_existing": 1, "artefacts_new": 1},
+                "paths": {DNA_PARENT: "/local/parent.txt", DNA_CHILD: "/export/child.txt"},
+            },
+            id="merges-into-existing-db",
+        ),
+        pytest.param(
+            {
+                "repeat": True,
+                "expected": {
+                    "artefacts_new": 0,
+                    "events_inserted": 0,
+                    "edges_inserted": 0,
+                    "links_inserted": 0,
+                },
+                "paths": {DNA_PARENT: "/export/parent.txt", DNA_CHILD: "/export/child.txt"},
+            },
+            id="idempotent",
+        ),
+        pytest.param(
+            {"dry_run": True, "expected": {"artefacts_new": 2}, "paths": {}},
+            id="dry-run",
+        ),
+    ],
+)
+def test_import_lineage(dest_db, lineage_bundle, scenario):
+    if scenario.get("preseed"):
+        _preseed_local_parent(dest_db)
+    if scenario.get("repeat"):
+        first = sync.import_lineage(dest_db, lineage_bundle)
+        assert first["artefacts_new"] == 2
+
+    stats = sync.import_lineage(dest_db, lineage_bundle, dry_run=scenario.get("dry_run", False))
+
+    for key, value in scenario["expected"].items():
+        assert stats[key] == value, key
+    rows = dest_db.execute("SELECT dna_token, path FROM artefacts").fetchall()
+    assert {row["dna_token"]: row["path"] for row in rows} == scenario["paths"]
+    if scenario["paths"]:
+        tag = dest_db.execute(
             """
             SELECT t.tag FROM tags t
             JOIN artefacts a ON a.id = t.artefact_id
@@ -95,63 +205,48 @@ def test_import_lineage_creates_missing_records(tmp_path):
             (DNA_PARENT,),
         ).fetchone()
         assert tag["tag"] == "baseline"
-    finally:
-        dest.close()
 
 
-def test_import_lineage_merges_into_existing_db(tmp_path):
-    bundle = _build_bundle(tmp_path)
-    dest = _make_conn(tmp_path / "merge.db")
-    try:
-        artefacts.create_project(dest, "demo", "Local Demo", None)
-        existing = artefacts.create_artefact(
-            dest,
-            dna_token=DNA_PARENT,
-            path="/local/parent.txt",
-            file_hash="local-hash",
-            artefact_type="design",
-            description="local copy",
-        )
-        artefacts.assign_projects(dest, existing["id"], ["demo"])
-        stats = sync.import_lineage(dest, bundle)
-        assert stats["artefacts_existing"] == 1
-        assert stats["artefacts_new"] == 1
-        row = dest.execute(
-            "SELECT path FROM artefacts WHERE dna_token = ?",
-            (DNA_PARENT,),
-        ).fetchone()
-        assert row["path"] == "/local/parent.txt"
-        child = dest.execute(
-            "SELECT path FROM artefacts WHERE dna_token = ?",
-            (DNA_CHILD,),
-        ).fetchone()
-        assert child["path"] == "/export/child.txt"
-    finally:
-        dest.close()
+def test_import_lineage_skips_duplicates_within_bundle(dest_db, lineage_bundle):
+    bundle = copy.deepcopy(lineage_bundle)
+    bundle["projects"] = bundle["projects"] * 2
+    bundle["artefacts"] = bundle["artefacts"] * 2
+    bundle["tags"] = bundle["tags"] * 2
+    bundle["notes"] = bundle["notes"] * 2
+    bundle["edges"] = bundle["edges"] * 2
+    bundle["events"] = bundle["events"] + [
+        {"dna": DNA_CHILD, "event_type": "reviewed", "metadata": {"b": 1, "a": 2}, "created_at": "2024-02-01"},
+        {"dna": DNA_CHILD, "event_type": "reviewed", "metadata": '{"a": 2, "b": 1}', "created_at": "2024-02-01"},
+    ]
+    bundle["artefact_projects"] = bundle["artefact_projects"] * 2
+    stats = sync.import_lineage(dest_db, bundle)
+    assert stats["projects_new"] == 2 and stats["projects_existing"] == 2
+    assert stats["artefacts_new"] == 2 and stats["artefacts_existing"] == 2
+    assert stats["tags_inserted"] == 1 and stats["tags_skipped"] == 1
+    assert stats["notes_inserted"] == 1 and stats["notes_skipped"] == 1
+    assert stats["edges_inserted"] == 1 and stats["edges_skipped"] == 1
+    assert stats["events_inserted"] == len(bundle["events"]) - 1 and stats["events_skipped"] == 1
+    assert stats["links_inserted"] == 3 and stats["links_skipped"] == 3
+    edges = dest_db.execute("SELECT COUNT(*) AS cnt FROM edges").fetchone()
+    assert edges["cnt"] == 1
+
+
+def test_export_reads_one_snapshot(db, tmp_path, monkeypatch):
+    _seed_lineage(db)
+    writer = connect(tmp_path / "eng_dna.db")
+    original = sync._fetch_tags
 
+    def _write_mid_export(conn, lineage_ids):
+        # A commit from another connection between the export's reads.
+        with writer:
+            writer.execute("INSERT INTO tags (artefact_id, tag) SELECT id, 'late' FROM artefacts")
+        return original(conn, lineage_ids)
 
-def test_import_lineage_is_idempotent(tmp_path):
-    bundle = _build_bundle(tmp_path)
-    dest = _make_conn(tmp_path / "idem.db")
+    monkeypatch.setattr(sync, "_fetch_tags", _write_mid_export)
     try:
-        first = sync.import_lineage(dest, bundle)
-        assert first["artefacts_new"] == 2
-        second = sync.import_lineage(dest, bundle)
-        assert second["artefacts_new"] == 0
-        assert second["events_inserted"] == 0
-        assert second["edges_inserted"] == 0
-        assert second["links_inserted"] == 0
+        bundle = sync.export_project_lineage(db, "demo")
     finally:
-        dest.close()
+        writer.close()
 
-
-def test_import_lineage_dry_run(tmp_path):
-    bundle = _build_bundle(tmp_path)
-    dest = _make_conn(tmp_path / "dry.db")
-    try:
-        stats = sync.import_lineage(dest, bundle, dry_run=True)
-        assert stats["artefacts_new"] == 2
-        count = dest.execute("SELECT COUNT(*) AS cnt FROM artefacts").fetchone()
-        assert count["cnt"] == 0
-    finally:
-        dest.close()
+    assert [tag["tag"] for tag in bundle["tags"]] == ["baseline"]
+    assert db.execute("SELECT COUNT(*) AS c FROM tags WHERE tag = 'late'").fetchone()["c"] == 2
@@ -1,69 +1,117 @@
 from __future__ import annotations
 
-from typer.testing import CliRunner
+import pytest
+from click.testing import CliRunner
 
-from eng_dna import artefacts
-from eng_dna.cli import app
-from eng_dna.db import connect, ensure_schema
+from eng_dna import artefacts, operations, sidecar
 
 runner = CliRunner()
 
 
-def _prepare_db(tmp_path):
-    db_path = tmp_path / "eng_dna.db"
-    conn = connect(db_path)
-    ensure_schema(conn)
-    conn.close()
-    return db_path
+HASH_ONE = "0" * 64
+HASH_TWO = "1" * 64
 
 
-def test_cli_tag_default_snapshot_creates_version(tmp_path, monkeypatch) -> None:
-    db_path = _prepare_db(tmp_path)
-    monkeypatch.setenv("EDNA_DB_PATH", str(db_path))
+def test_cli_tag_default_snapshot_creates_version(
+    tmp_path, monkeypatch, cli_db, cli_command
+) -> None:
+    conn = cli_db
+    monkeypatch.setenv("EDNA_TEST_PRECOMPUTED_HASH", "1")
 
+    # Hashes are supplied up front, so the file's contents are never read.
     target = tmp_path / "cli_snapshot.txt"
-    target.write_text("one", encoding="utf-8")
-    first = runner.invoke(app, ["tag", str(target), "--type", "text"])
-    assert first.exit_code == 0, first.stdout
-
-    target.write_text("two", encoding="utf-8")
-    second = runner.invoke(app, ["tag", str(target), "--type", "text"])
+    target.write_text("v1", encoding="utf-8")
+    # Only the re-tag needs the CLI; seed the first version directly.
+    operations.tag_file(
+        conn, target, artefact_type="text", description=None, tags=None, project_ids=None, file_hash=HASH_ONE
+    )
+
+    second = runner.invoke(
+        cli_command, ["tag", str(target), "--type", "text", "--precomputed-hash", HASH_TWO], catch_exceptions=False
+    )
     assert second.exit_code == 0, second.stdout
 
-    conn = connect(db_path)
-    ensure_schema(conn)
     count = conn.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"]
-    conn.close()
     assert count == 2
 
 
-def test_cli_tag_wip_updates_in_place(tmp_path, monkeypatch) -> None:
-    db_path = _prepare_db(tmp_path)
-    monkeypatch.setenv("EDNA_DB_PATH", str(db_path))
+def test_cli_tag_wip_updates_in_place(tmp_path, monkeypatch, cli_db, cli_command) -> None:
+    conn = cli_db
+    monkeypatch.setenv("EDNA_TEST_PRECOMPUTED_HASH", "1")
 
     target = tmp_path / "cli_wip.txt"
-    target.write_text("draft1", encoding="utf-8")
-    first = runner.invoke(app, ["tag", str(target), "--type", "text", "--mode", "wip"])
-    assert first.exit_code == 0, first.stdout
-
-    target.write_text("draft2", encoding="utf-8")
-    second = runner.invoke(app, ["tag", str(target), "--type", "text", "--mode", "wip"])
+    target.write_text("v1", encoding="utf-8")
+    operations.tag_file(
+        conn,
+        target,
+        artefact_type="text",
+        description=None,
+        tags=None,
+        project_ids=None,
+        mode="wip",
+        file_hash=HASH_ONE,
+    )
+
+    second = runner.invoke(
+        cli_command,
+        ["tag", str(target), "--type", "text", "--mode", "wip", "--precomputed-hash", HASH_TWO],
+        catch_exceptions=False,
+    )
     assert second.exit_code == 0, second.stdout
 
-    conn = connect(db_path)
-    ensure_schema(conn)
     count = conn.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"]
     artefact = artefacts.lookup_by_path(conn, str(target.resolve()))
-    events = artefacts.list_events(conn, artefact["id"])
-    conn.close()
 
     assert count == 1
-    assert any(event["event_type"] == "wip_saved" for event in events)
-    assert not any(event["event_type"] == "version_created" for event in events)
+    assert artefacts.has_event(conn, artefact["id"], "wip_saved")
+    assert not artefacts.has_event(conn, artefact["id"], "version_created")
 
 
-def test_tag_help_mentions_mode() -> None:
-    result = runner.invoke(app, ["tag", "--help"])
+def test_tag_help_mentions_mode(cli_command) -> None:
+    result = runner.invoke(cli_command, ["tag", "--help"], catch_exceptions=False)
     assert result.exit_code == 0
     assert "--mode" in result.stdout
     assert "snapshot" in result.stdout and "wip" in result.stdout
+
+
+def test_precomputed_hash_requires_test_env(tmp_path, monkeypatch, cli_db, cli_command) -> None:
+    monkeypatch.delenv("EDNA_TEST_PRECOMPUTED_HASH", raising=False)
+    target = tmp_path / "gated.txt"
+    target.write_text("v1", encoding="utf-8")
+
+    result = runner.invoke(cli_command, ["tag", str(target), "--precomputed-hash", HASH_ONE])
+
+    assert result.exit_code != 0
+    # Typer wraps the error in a bordered panel; compare on the words alone.
+    message = " ".join(result.output.replace("│", " ").split())
+    assert "only available with EDNA_TEST_PRECOMPUTED_HASH=1" in message
+    assert cli_db.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"] == 0
+    assert not target.with_name(target.name + ".edna").exists()
+
+
+@pytest.mark.parametrize("supplied", [{"file_hash": HASH_ONE}, {"content": b"v1"}])
+def test_supplied_hash_rejects_missing_file(tmp_path, db, supplied) -> None:
+    target = tmp_path / "missing.txt"
+
+    with pytest.raises(FileNotFoundError):
+        operations.tag_file(
+            db, target, artefact_type=None, description=None, tags=None, project_ids=None, **supplied
+        )
+
+    assert db.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"] == 0
+    assert not target.with_name(target.name + ".edna").exists()
+
+
+def test_precomputed_hash_is_not_paired_with_file_signature(tmp_path, db, age_file) -> None:
+    target = tmp_path / "settled.txt"
+    target.write_text("real", encoding="utf-8")
+    age_file(target)
+
+    operations.tag_file(
+        db, target, artefact_type=None, description=None, tags=None, project_ids=None, file_hash=HASH_ONE
+    )
+
+    sidecar.clear_sidecar_cache()
+    info = sidecar.read_identity(target)
+    assert info.file_hash == HASH_ONE
+    assert info.mtime_ns is None and info.size is None
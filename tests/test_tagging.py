@@ -10,9 +10,9 @@ def test_tagging_and_linking(db, tmp_path: Path) -> None:
     artefacts.create_project(db, "proj1", "Demo", None)
 
     parent_path = tmp_path / "parent.txt"
-    parent_path.write_text("parent", encoding="utf-8")
     child_path = tmp_path / "child.txt"
-    child_path.write_text("child", encoding="utf-8")
+    parent_path.write_bytes(b"parent")
+    child_path.write_bytes(b"child")
 
     parent = operations.tag_file(
         db,
@@ -21,6 +21,7 @@ def test_tagging_and_linking(db, tmp_path: Path) -> None:
         description="parent file",
         tags=["geometry"],
         project_ids=["proj1"],
+        content=b"parent",
     )
     child = operations.tag_file(
         db,
@@ -29,6 +30,7 @@ def test_tagging_and_linking(db, tmp_path: Path) -> None:
         description="child file",
         tags=["report"],
         project_ids=None,
+        content=b"child",
     )
 
     operations.link_artefacts(db, child, [parent], relation_type="derived_from", reason="unit test")
@@ -6,6 +6,13 @@ import pytest
 from eng_dna import artefacts, operations
 
 
+@pytest.fixture()
+def db(rollback_db):
+    # Versioning tests only make small isolated writes: share one in-memory
+    # schema per module and roll each test back instead of creating a file DB.
+    return rollback_db
+
+
 def test_new_version_is_created_on_hash_change(db, tmp_path: Path) -> None:
     target = tmp_path / "report.txt"
     target.write_text("v1", encoding="utf-8")
@@ -30,8 +37,7 @@ def test_new_version_is_created_on_hash_change(db, tmp_path: Path) -> None:
     )
 
     assert first["dna_token"] != second["dna_token"]
-    parents = artefacts.list_parents(db, second["id"])
-    assert any(parent["dna_token"] == first["dna_token"] for parent in parents)
+    assert artefacts.has_parent(db, second["id"], first["id"])
 
 
 def test_retagging_same_content_reuses_existing_artefact(db, tmp_path: Path) -> None:
@@ -77,8 +83,7 @@ def test_show_does_not_create_new_artefact(db, tmp_path: Path) -> None:
     assert viewed["id"] == artefact["id"]
     count = db.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"]
     assert count == 1
-    events = artefacts.list_events(db, artefact["id"])
-    assert not any(event["event_type"] == "version_created" for event in events)
+    assert not artefacts.has_event(db, artefact["id"], "version_created")
 
 
 def test_show_updates_path_on_move(db, tmp_path: Path) -> None:
@@ -106,8 +111,7 @@ def test_show_updates_path_on_move(db, tmp_path: Path) -> None:
     assert updated["path"] == str(new_path.resolve())
     count = db.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"]
     assert count == 1
-    events = artefacts.list_events(db, updated["id"])
-    assert any(event["event_type"] == "moved" for event in events)
+    assert artefacts.has_event(db, updated["id"], "moved")
 
 
 def test_wip_mode_keeps_same_dna_on_hash_change(db, tmp_path: Path) -> None:
@@ -139,9 +143,8 @@ def test_wip_mode_keeps_same_dna_on_hash_change(db, tmp_path: Path) -> None:
     assert first["dna_token"] == second["dna_token"]
     count = db.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"]
     assert count == 1
-    events = artefacts.list_events(db, first["id"])
-    assert any(event["event_type"] == "wip_saved" for event in events)
-    assert not any(event["event_type"] == "version_created" for event in events)
+    assert artefacts.has_event(db, first["id"], "wip_saved")
+    assert not artefacts.has_event(db, first["id"], "version_created")
 
 
 def test_wip_then_snapshot_creates_single_new_version(db, tmp_path: Path) -> None:
@@ -192,12 +195,9 @@ def test_wip_then_snapshot_creates_single_new_version(db, tmp_path: Path) -> Non
     assert final_snapshot["id"] != baseline["id"]
     count = db.execute("SELECT COUNT(*) AS c FROM artefacts").fetchone()["c"]
     assert count == 2
-    parents = artefacts.list_parents(db, final_snapshot["id"])
-    assert any(parent["id"] == baseline["id"] for parent in parents)
-    parent_events = artefacts.list_events(db, baseline["id"])
-    assert any(event["event_type"] == "wip_saved" for event in parent_events)
-    child_events = artefacts.list_events(db, final_snapshot["id"])
-    assert not any(event["event_type"] == "wip_saved" for event in child_events)
+    assert artefacts.has_parent(db, final_snapshot["id"], baseline["id"])
+    assert artefacts.has_event(db, baseline["id"], "wip_saved")
+    assert not artefacts.has_event(db, final_snapshot["id"], "wip_saved")
 
 
 def test_invalid_mode_raises(db, tmp_path: Path) -> None:
@@ -214,3 +214,33 @@ def test_invalid_mode_raises(db, tmp_path: Path) -> None:
             project_ids=None,
             mode="invalid",
         )
+
+
+def test_settled_file_hash_is_cached(db, tmp_path: Path, monkeypatch, age_file) -> None:
+    target = tmp_path / "settled.txt"
+    target.write_text("settled", encoding="utf-8")
+    old = age_file(target)
+
+    first = operations.tag_file(
+        db, target, artefact_type="text", description=None, tags=None, project_ids=None
+    )
+    row = db.execute("SELECT * FROM hash_cache WHERE path = ?", (str(target.resolve()),)).fetchone()
+    assert row["hash"] == first["hash"] and row["mtime_ns"] == old
+
+    operations._hash_memo.clear()
+
+    def _no_hash(path, *args, **kwargs):
+        raise AssertionError("settled file was re-hashed")
+
+    monkeypatch.setattr(operations, "compute_file_hash", _no_hash)
+    again = operations.tag_file(
+        db, target, artefact_type="text", description=None, tags=None, project_ids=None
+    )
+    assert again["dna_token"] == first["dna_token"]
+
+    # A fresh write is younger than MTIME_SETTLE_NS and must be hashed again.
+    target.write_text("changed", encoding="utf-8")
+    with pytest.raises(AssertionError, match="re-hashed"):
+        operations.tag_file(
+            db, target, artefact_type="text", description=None, tags=None, project_ids=None
+        )